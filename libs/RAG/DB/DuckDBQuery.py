@@ -20,7 +20,9 @@ class DuckDBQuery(DatabaseQuery):
             print("DuckDB 未連接。")
             return None
         try:
-            return self.connection.execute(sql_query).fetchall()
+            # 每次查詢使用獨立的 cursor，多執行緒共用同一連線時結果不會互相覆蓋
+            with self.connection.cursor() as cursor:
+                return cursor.execute(sql_query).fetchall()
         except Exception as e:
             print(f"DuckDB 查詢失敗: {e}")
             return None
@@ -30,7 +32,8 @@ class DuckDBQuery(DatabaseQuery):
             print("DuckDB 未連接。")
             return None
         try:
-            return self.connection.execute(sql_query, params).fetchall()
+            with self.connection.cursor() as cursor:
+                return cursor.execute(sql_query, params).fetchall()
         except Exception as e:
             print(f"DuckDB 參數化查詢失敗: {e}")
             return None
@@ -11,6 +11,9 @@ from typing import List, Dict, Any, Optional
 from pathlib import Path
 import re
 
+# 語義搜索快取的最大項目數
+SEARCH_CACHE_SIZE = 256
+
 class NotebookKnowledgeBase:
     """筆記型電腦知識庫管理"""
     
@@ -24,6 +27,8 @@ class NotebookKnowledgeBase:
         self.logger = logging.getLogger(__name__)
         self.csv_path = csv_path or self._get_default_csv_path()
         self.products = self.load_products()
+        # 語義搜索結果快取，相同查詢直接返回（最多 SEARCH_CACHE_SIZE 項）
+        self._search_cache: Dict[str, List[Dict[str, Any]]] = {}
         
     def _get_default_csv_path(self) -> str:
         """獲取默認CSV路徑"""
@@ -192,6 +197,10 @@ class NotebookKnowledgeBase:
             相關產品列表
         """
         query_lower = query.lower()
+        cached = self._search_cache.get(query_lower)
+        if cached is not None:
+            return list(cached)
+        
         relevant_products = []
         
         for product in self.products:
@@ -219,7 +228,12 @@ class NotebookKnowledgeBase:
         
         # 按相關性排序
         relevant_products.sort(key=lambda x: x[1], reverse=True)
-        return [p[0] for p in relevant_products]
+        results = [p[0] for p in relevant_products]
+        # 超過上限時先淘汰最早加入的項目
+        if len(self._search_cache) >= SEARCH_CACHE_SIZE:
+            self._search_cache.pop(next(iter(self._search_cache)))
+        self._search_cache[query_lower] = results
+        return list(results)
     
     def get_product_by_id(self, product_id: str) -> Optional[Dict[str, Any]]:
         """根據ID獲取產品"""
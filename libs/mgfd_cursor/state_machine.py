@@ -5,6 +5,7 @@ MGFD 狀態機實現
 簡化版本，不依賴LangGraph
 """
 
+import asyncio
 import logging
 from typing import Dict, Any, Optional
 from .models import NotebookDialogueState, ActionType
@@ -63,6 +64,19 @@ class MGFDStateMachine:
         else:
             return self._handle_unknown_action(state, action)
     
+    async def process_user_input_async(self, session_id: str, user_input: str) -> Dict[str, Any]:
+        """
+        非同步處理用戶輸入，供多個會話以 asyncio.gather 並行處理
+        
+        Args:
+            session_id: 會話ID
+            user_input: 用戶輸入
+            
+        Returns:
+            處理結果
+        """
+        return await asyncio.to_thread(self.process_user_input, session_id, user_input)
+    
     def _handle_elicitation(self, state: NotebookDialogueState, action) -> Dict[str, Any]:
         """處理信息收集"""
         # 從用戶輸入中提取槽位信息
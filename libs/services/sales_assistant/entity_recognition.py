@@ -98,7 +98,7 @@ class EntityRecognitionSystem:
             },
             'MODEL_TYPE': {
                 'patterns': [
-                    r'(?:819|839|928|958|960|AC01)(?=系列|型號|筆電|notebook|$|\s|[^\d])'
+                    r'(?:8(?:19|39)|9(?:28|58|60)|AC01)(?=系列|型號|筆電|notebook|$|\s|[^\d])'
                 ],
                 'description': '型號系列識別'
             },
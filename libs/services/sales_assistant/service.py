@@ -9,6 +9,7 @@ from .multichat import MultichatManager, ChatTemplateManager
 from .multichat.funnel_manager import FunnelConversationManager, FunnelQueryType, FunnelFlowType
 import logging
 import re
+import time
 from typing import Dict, Any
 
 # 設定日誌
@@ -74,6 +75,12 @@ def _get_available_modeltypes_from_db():
 # 初始化時從數據庫獲取可用的modeltype
 AVAILABLE_MODELTYPES = _get_available_modeltypes_from_db()
 
+# 查詢意圖解析快取的最大項目數
+QUERY_INTENT_CACHE_SIZE = 256
+# 查詢資料快取的最大項目數與存活秒數（逾時後重新查詢，讓資料庫更新最終反映出來）
+QUERY_DATA_CACHE_SIZE = 256
+QUERY_DATA_CACHE_TTL = 300
+
 '''
 [
     'modeltype', 'version', 'modelname', 'mainboard', 'devtime',
@@ -119,6 +126,18 @@ class SalesAssistantService(BaseService):
             'wireless', 'lan', 'bluetooth', 'softwareconfig', 'ai', 'accessory', 
             'certfications', 'otherfeatures'
         ]
+        
+        # 查詢結果快取：系列→型號清單、查詢文字→意圖解析結果（資料庫與關鍵字配置於執行期間不變）
+        self._models_by_type_cache = {}
+        self._query_intent_cache = {}
+        # 查詢資料快取：(query_type, modeltypes, modelnames) → (寫入時間, 規格資料, 目標型號)
+        self._query_data_cache = {}
+
+    def clear_query_caches(self):
+        """清除系列型號、查詢意圖與查詢資料快取（資料庫或關鍵字配置更新後呼叫）"""
+        self._models_by_type_cache.clear()
+        self._query_intent_cache.clear()
+        self._query_data_cache.clear()
 
     def _load_prompt_template(self, path: str) -> str:
         with open(path, 'r', encoding='utf-8') as f:
@@ -902,19 +921,31 @@ class SalesAssistantService(BaseService):
         """
         根據modeltype獲取所有相關的modelname
         """
+        cached = self._models_by_type_cache.get(modeltype)
+        if cached is not None:
+            return list(cached)
+        
         try:
             # 使用DuckDB直接查詢該modeltype的所有modelname
             sql_query = "SELECT DISTINCT modelname FROM specs WHERE modeltype = ?"
             
             results = self.duckdb_query.query_with_params(sql_query, [modeltype])
             
+            # query_with_params 查詢失敗時回傳 None：不快取，下次重試
+            if results is None:
+                logging.warning(f"查詢modeltype '{modeltype}' 的modelname失敗")
+                return []
+            
             if results:
                 modelnames = [record[0] for record in results]
                 logging.info(f"根據modeltype '{modeltype}' 找到的modelname: {modelnames}")
-                return modelnames
             else:
                 logging.warning(f"未找到modeltype '{modeltype}' 的modelname")
-                return []
+                modelnames = []
+            
+            # 快取查詢成功的結果（包含確實沒有型號的空清單）
+            self._models_by_type_cache[modeltype] = modelnames
+            return list(modelnames)
                 
         except Exception as e:
             logging.error(f"查詢modeltype '{modeltype}' 相關modelname時發生錯誤: {e}")
@@ -925,6 +956,10 @@ class SalesAssistantService(BaseService):
         解析用户查询意图
         返回包含modelname、modeltype、intent的字典
         """
+        cached = self._query_intent_cache.get(query)
+        if cached is not None:
+            return {**cached, "modelnames": list(cached["modelnames"]), "modeltypes": list(cached["modeltypes"])}
+        
         try:
             logging.info(f"開始解析查詢意圖: {query}")
             
@@ -960,6 +995,11 @@ class SalesAssistantService(BaseService):
                     break
             
             logging.info(f"查詢意圖解析結果: {result}")
+            
+            # 快取解析結果，超過上限時先淘汰最早加入的項目
+            if len(self._query_intent_cache) >= QUERY_INTENT_CACHE_SIZE:
+                self._query_intent_cache.pop(next(iter(self._query_intent_cache)))
+            self._query_intent_cache[query] = {**result, "modelnames": list(result["modelnames"]), "modeltypes": list(result["modeltypes"])}
             return result
             
         except Exception as e:
@@ -973,7 +1013,35 @@ class SalesAssistantService(BaseService):
 
     def _get_data_by_query_type(self, query_intent: dict) -> tuple[list, list]:
         """
-        根据查询类型获取数据
+        根据查询类型获取数据（成功結果快取 QUERY_DATA_CACHE_TTL 秒）
+        返回 (context_list_of_dicts, target_modelnames)
+        """
+        # 型號順序會影響結果（系列查詢只取第一個），鍵值保留原順序
+        cache_key = (
+            query_intent.get("query_type"),
+            tuple(query_intent.get("modeltypes") or ()),
+            tuple(query_intent.get("modelnames") or ()),
+        )
+        cached = self._query_data_cache.get(cache_key)
+        if cached is not None and time.monotonic() - cached[0] < QUERY_DATA_CACHE_TTL:
+            return [dict(row) for row in cached[1]], list(cached[2])
+        
+        context_list_of_dicts, target_modelnames = self._fetch_data_by_query_type(query_intent)
+        
+        # 只快取成功結果，錯誤仍每次拋出；超過上限時先淘汰最早加入的項目
+        self._query_data_cache.pop(cache_key, None)
+        if len(self._query_data_cache) >= QUERY_DATA_CACHE_SIZE:
+            self._query_data_cache.pop(next(iter(self._query_data_cache)))
+        self._query_data_cache[cache_key] = (
+            time.monotonic(),
+            [dict(row) for row in context_list_of_dicts],
+            list(target_modelnames),
+        )
+        return context_list_of_dicts, target_modelnames
+
+    def _fetch_data_by_query_type(self, query_intent: dict) -> tuple[list, list]:
+        """
+        根据查询类型从DuckDB获取数据（不經快取）
         返回 (context_list_of_dicts, target_modelnames)
         """
         try:
@@ -7,6 +7,7 @@
 
 import re
 import json
+from collections import Counter
 from pathlib import Path
 
 def test_has_specific_models(query: str) -> bool:
@@ -142,7 +143,8 @@ def main():
         ("列出所有筆電型號", False, "列表查詢 - 不應觸發問卷"),
     ]
     
-    results = []
+    tally = Counter()
+    failures = []
     print(f"{'序號':<4} {'查詢內容':<40} {'預期結果':<12} {'實際結果':<12} {'狀態':<6} {'說明'}")
     print("-" * 100)
     
@@ -153,11 +155,15 @@ def main():
         status = "✅ 通過" if should_trigger == expected_trigger else "❌ 失敗"
         
         print(f"{i:<4} {query[:38]:<40} {expected_str:<12} {actual_str:<12} {status:<6} {description}")
-        results.append((query, expected_trigger, should_trigger, status))
+        if should_trigger == expected_trigger:
+            tally['pass'] += 1
+        else:
+            tally['fail'] += 1
+            failures.append((query, expected_trigger, should_trigger))
     
     # 統計結果
-    passed = sum(1 for _, expected, actual, _ in results if expected == actual)
-    total = len(results)
+    passed = tally['pass']
+    total = passed + tally['fail']
     success_rate = passed / total * 100
     
     print("\n" + "=" * 100)
@@ -173,11 +179,10 @@ def main():
     else:
         print(f"\n⚠️  有 {total - passed} 個案例需要進一步調整。")
         print("\n失敗案例詳情:")
-        for query, expected, actual, status in results:
-            if expected != actual:
-                print(f"  - {query}")
-                print(f"    預期: {'觸發問卷' if expected else '不觸發問卷'}")
-                print(f"    實際: {'觸發問卷' if actual else '不觸發問卷'}")
+        for query, expected, actual in failures:
+            print(f"  - {query}")
+            print(f"    預期: {'觸發問卷' if expected else '不觸發問卷'}")
+            print(f"    實際: {'觸發問卷' if actual else '不觸發問卷'}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -6,8 +6,13 @@ Multi-round Funnel Conversation 測試腳本
 """
 
 import asyncio
+import contextlib
+import io
 import json
+import os
 import sys
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 sys.path.append(str(Path(__file__).parent))
 
@@ -42,7 +47,7 @@ def test_query_classification():
         ("哪個系列適合學生使用？", FunnelQueryType.MIXED_AMBIGUOUS),
     ]
     
-    results = []
+    tally = Counter()
     print(f"{'序號':<4} {'查詢內容':<45} {'預期類型':<20} {'實際類型':<20} {'信心度':<8} {'狀態'}")
     print("-" * 110)
     
@@ -51,11 +56,11 @@ def test_query_classification():
         status = "✅ 通過" if actual_type == expected_type else "❌ 失敗"
         
         print(f"{i:<4} {query[:43]:<45} {expected_type.value:<20} {actual_type.value:<20} {confidence:<8.2f} {status}")
-        results.append((query, expected_type, actual_type, confidence, status))
+        tally['pass' if actual_type == expected_type else 'fail'] += 1
     
     # 統計結果
-    passed = sum(1 for _, expected, actual, _, _ in results if expected == actual)
-    total = len(results)
+    passed = tally['pass']
+    total = passed + tally['fail']
     success_rate = passed / total * 100
     
     print(f"\n📊 分類測試結果:")
@@ -86,7 +91,7 @@ def test_funnel_triggering():
         ("958系列的價格範圍", False),
     ]
     
-    results = []
+    tally = Counter()
     print(f"{'序號':<4} {'查詢內容':<50} {'預期觸發':<10} {'實際觸發':<10} {'狀態'}")
     print("-" * 85)
     
@@ -98,11 +103,11 @@ def test_funnel_triggering():
         expected_str = "是" if expected_trigger else "否"
         
         print(f"{i:<4} {query[:48]:<50} {expected_str:<10} {trigger_str:<10} {status}")
-        results.append((query, expected_trigger, should_trigger, status))
+        tally['pass' if should_trigger == expected_trigger else 'fail'] += 1
     
     # 統計結果
-    passed = sum(1 for _, expected, actual, _ in results if expected == actual)
-    total = len(results)
+    passed = tally['pass']
+    total = passed + tally['fail']
     success_rate = passed / total * 100
     
     print(f"\n📊 觸發測試結果:")
@@ -278,12 +283,27 @@ def test_funnel_config_loading():
         print(f"❌ 配置載入測試失敗: {e}")
         return False
 
+def _run_test(test_name, test_func):
+    """在子程序中執行單一測試，擷取其輸出以便依序列印"""
+    buf = io.StringIO()
+    with contextlib.redirect_stdout(buf):
+        print(f"\n🔄 執行 {test_name}...")
+        try:
+            result = test_func()
+            status = "✅ 通過" if result else "❌ 失敗"
+            print(f"✨ {test_name}: {status}")
+        except Exception as e:
+            print(f"❌ {test_name} 執行失敗: {e}")
+            result = False
+    return result, buf.getvalue()
+
 def main():
     """主測試函數"""
     print("🚀 Multi-round Funnel Conversation 系統測試")
     print("=" * 100)
     
     test_results = []
+    tally = Counter()
     
     # 執行所有測試
     test_functions = [
@@ -294,24 +314,26 @@ def main():
         ("會話流程測試", test_funnel_session_flow),
     ]
     
-    for test_name, test_func in test_functions:
-        print(f"\n🔄 執行 {test_name}...")
-        try:
-            result = test_func()
+    # 各測試各自建立 FunnelConversationManager，互不共享狀態，可並行執行
+    max_workers = min(len(test_functions), os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            (test_name, executor.submit(_run_test, test_name, test_func))
+            for test_name, test_func in test_functions
+        ]
+        for test_name, future in futures:
+            result, output = future.result()
+            sys.stdout.write(output)
             test_results.append((test_name, result))
-            status = "✅ 通過" if result else "❌ 失敗"
-            print(f"✨ {test_name}: {status}")
-        except Exception as e:
-            print(f"❌ {test_name} 執行失敗: {e}")
-            test_results.append((test_name, False))
+            tally['pass' if result else 'fail'] += 1
     
     # 總結測試結果
     print("\n" + "=" * 100)
     print("📊 測試結果總結")
     print("=" * 100)
     
-    passed_tests = sum(1 for _, result in test_results if result)
-    total_tests = len(test_results)
+    passed_tests = tally['pass']
+    total_tests = passed_tests + tally['fail']
     success_rate = passed_tests / total_tests * 100
     
     for test_name, result in test_results:
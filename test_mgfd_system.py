@@ -5,6 +5,7 @@ MGFD 系統測試
 """
 
 import sys
+import asyncio
 from pathlib import Path
 current_dir = Path(__file__).parent
 sys.path.insert(0, str(current_dir))
@@ -92,10 +93,40 @@ def test_error_handling():
     
     print("\n✅ 錯誤處理測試完成！")
 
+def test_concurrent_sessions(session_count: int = 4):
+    """測試多個會話並行處理"""
+    print("\n🧪 測試多會話並行處理...")
+    
+    state_machine = create_notebook_sales_graph()
+    dialogue_manager = state_machine.dialogue_manager
+    
+    test_conversations = [
+        "我想要一台遊戲筆電",
+        "預算大概3萬左右",
+        "品牌偏好華碩",
+        "需要經常攜帶"
+    ]
+    session_ids = [dialogue_manager.create_session() for _ in range(session_count)]
+    
+    async def run_turns():
+        # 同一會話內的回合需依序進行，不同會話之間並行
+        for i, user_input in enumerate(test_conversations, 1):
+            results = await asyncio.gather(*[
+                state_machine.process_user_input_async(session_id, user_input)
+                for session_id in session_ids
+            ])
+            stages = [result['current_stage'] for result in results]
+            print(f"   回合 {i}: {len(results)} 個會話完成，階段: {stages}")
+    
+    asyncio.run(run_turns())
+    
+    print("\n✅ 多會話並行處理測試完成！")
+
 if __name__ == "__main__":
     try:
         test_mgfd_system()
         test_error_handling()
+        test_concurrent_sessions()
         print("\n🎉 所有測試通過！")
     except Exception as e:
         print(f"\n❌ 測試失敗: {e}")
@@ -7,78 +7,114 @@
 
 import re
 import json
+import pickle
 from pathlib import Path
 
-def test_has_specific_models(query: str) -> bool:
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+FEATURES_PATH = Path(__file__).parent / "libs/services/sales_assistant/multichat/nb_features.json"
+
+# 系列比較模式單獨掃描：系列號碼可能接在機型名稱後（如 NB819系列哪款），
+# 與具體機型合併掃描時會先被機型名稱取走
+# 系列模式中的 `.*比較` 等改寫為前瞻，只需判斷是否出現
+_SERIES_PATTERN = re.compile(
+    r'\b(?:819|839|958)\s*(?:系列|機型|款|型號)'         # 819系列、958機型、839款、819型號
+    r'|比較\s*(?:819|839|958)\s*系列'                    # 比較819系列
+    r'|(?:819|839|958)\s*系列(?=.*(?:比較|哪款|機型))',     # 819系列...比較 / 哪款 / 機型
+    re.IGNORECASE,
+)
+
+# 具體機型、純系列號碼、比較關鍵字合併為單一正則聯集，每個查詢只掃描一次
+_CLASSIFY_PATTERN = re.compile(
+    r'(?P<specific>'
+    r'[A-Z]{1,3}\d{3}[A-Z]*'                          # 如 AG958, APX958, NB819 等完整機型名稱
+    r'|i[3579]-\d+'                                   # 如 i7-1234 等具體CPU型號
+    r'|Ryzen\s+[579]\s+\d+'                           # 如 Ryzen 7 5800H 等具體CPU型號
+    r')'
+    r'|(?P<series_num>\b(?:819|839|958)\b)'             # 純系列號碼（819, 839, 958）
+    r'|(?P<compare_kw>比較|差別|不同|差異)',
+    re.IGNORECASE,
+)
+
+def _classify(query: str) -> dict:
+    """掃描查詢字串（系列模式另行搜尋），回傳各類別是否命中"""
+    matched = {}
+    series = _SERIES_PATTERN.search(query)
+    if series:
+        matched["series"] = series.group()
+    for m in _CLASSIFY_PATTERN.finditer(query):
+        matched.setdefault(m.lastgroup, m.group())
+
+    has_specific = "specific" in matched
+    is_series = "series" in matched or (
+        "series_num" in matched and "compare_kw" in matched and not has_specific
+    )
+    return {
+        "has_specific": has_specific,
+        "is_series": is_series,
+        "has_compare_kw": "compare_kw" in matched,
+        "matched": matched,
+    }
+
+def test_has_specific_models(query: str, flags: dict = None) -> bool:
     """模擬修復後的 _has_specific_models 函數邏輯"""
-    # 具體機型模式：完整的機型名稱，如 AG958, APX958, NB819-A 等
-    # 排除純系列號碼（819, 839, 958）的匹配
-    specific_model_patterns = [
-        r'[A-Z]{2,3}\d{3}',  # 如 AG958, APX958, NB819 等
-        r'i[3579]-\d+',      # 如 i7-1234 等具體CPU型號
-        r'Ryzen\s+[579]\s+\d+',  # 如 Ryzen 7 5800H 等具體CPU型號
-    ]
-    
-    # 檢查是否包含具體機型名稱
-    for pattern in specific_model_patterns:
-        if re.search(pattern, query, re.IGNORECASE):
-            print(f"  ✅ 找到具體機型模式: '{pattern}'")
-            return True
-    
-    # 檢查是否包含常見的機型名稱關鍵字組合
-    # 例如：「AG958 和 APX958 的比較」這類具體機型比較
-    model_mention_patterns = [
-        r'[A-Z]{1,3}\d{3}[A-Z]*[-\s]*[A-Z]*\d*',  # 完整機型名稱
-    ]
-    
-    for pattern in model_mention_patterns:
-        matches = re.findall(pattern, query, re.IGNORECASE)
-        if matches and len(matches) >= 1:  # 至少提到一個具體機型
-            # 驗證是否為有效的機型名稱格式（不只是系列號碼）
-            valid_models = [m for m in matches if len(m) > 3 and not re.match(r'^\d{3}$', m)]
-            if valid_models:
-                print(f"  ✅ 找到具體機型名稱: {valid_models}")
-                return True
-    
+    flags = flags or _classify(query)
+    if flags["has_specific"]:
+        print(f"  ✅ 找到具體機型名稱: '{flags['matched']['specific']}'")
+        return True
+
     print(f"  ❌ 未檢測到具體機型，判定為系列或模糊查詢")
     return False
 
-def test_is_series_comparison(query: str) -> bool:
+def test_is_series_comparison(query: str, flags: dict = None) -> bool:
     """模擬 _is_series_comparison 函數邏輯"""
-    # 系列比較的模式：包含系列號碼+系列關鍵字的組合
-    series_patterns = [
-        r'\b(819|839|958)\s*系列',           # 819系列、958系列
-        r'\b(819|839|958)\s*機型',           # 819機型、958機型  
-        r'\b(819|839|958)\s*款',             # 819款、958款
-        r'\b(819|839|958)\s*型號',           # 819型號、958型號
-        r'比較\s*(819|839|958)\s*系列',      # 比較819系列
-        r'(819|839|958)\s*系列.*比較',       # 819系列...比較
-        r'(819|839|958)\s*系列.*哪款',       # 819系列哪款
-        r'(819|839|958)\s*系列.*機型',       # 819系列機型
-    ]
-    
-    for pattern in series_patterns:
-        if re.search(pattern, query, re.IGNORECASE):
-            print(f"  ✅ 找到系列比較模式: {pattern}")
-            return True
-    
+    flags = flags or _classify(query)
+    if "series" in flags["matched"]:
+        print(f"  ✅ 找到系列比較模式: '{flags['matched']['series']}'")
+        return True
+
     # 額外檢查：是否同時包含數字系列和比較關鍵字，但沒有具體機型名稱
-    if re.search(r'\b(819|839|958)\b', query) and any(keyword in query.lower() for keyword in ["比較", "差別", "不同", "差異"]):
-        # 確認不包含具體機型名稱
-        if not test_has_specific_models(query):
-            print(f"  ✅ 找到數字系列+比較關鍵字組合")
-            return True
-    
+    if flags["is_series"]:
+        print(f"  ✅ 找到數字系列+比較關鍵字組合")
+        return True
+
     print(f"  ❌ 未檢測到系列比較模式")
     return False
 
+def test_series_comparison_after_model_name():
+    """系列號碼接在機型名稱後（如 NB819系列哪款）時，單獨呼叫仍判定為系列比較"""
+    for query in ["NB819系列哪款", "AG958系列比較", "NB839系列機型"]:
+        assert test_is_series_comparison(query), query
+        assert test_has_specific_models(query), query
+    assert not test_is_series_comparison("AG958和APX958比較")
+
+def _cached_load(features_path: Path) -> dict:
+    """載入JSON配置，並以同名 .pkl 快取解析結果；來源檔較新時重新解析"""
+    cache_path = features_path.with_suffix('.pkl')
+    try:
+        if cache_path.stat().st_mtime >= features_path.stat().st_mtime:
+            with open(cache_path, 'rb') as f:
+                return pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        pass
+
+    raw = features_path.read_bytes()
+    config = orjson.loads(raw) if orjson else json.loads(raw)
+    try:
+        with open(cache_path, 'wb') as f:
+            pickle.dump(config, f, protocol=pickle.HIGHEST_PROTOCOL)
+    except OSError as e:
+        print(f"寫入配置快取失敗: {e}")
+    return config
+
 def load_trigger_keywords():
     """載入觸發關鍵字"""
     try:
-        features_path = Path(__file__).parent / "libs/services/sales_assistant/multichat/nb_features.json"
-        with open(features_path, 'r', encoding='utf-8') as f:
-            config = json.load(f)
-            return config.get("trigger_keywords", {})
+        config = _cached_load(FEATURES_PATH)
+        return config.get("trigger_keywords", {})
     except Exception as e:
         print(f"載入配置失敗: {e}")
         return {}
@@ -96,6 +132,7 @@ def test_multichat_trigger(query: str) -> tuple:
     print(f"  📝 comparison_keywords: {comparison_keywords}")
     
     query_lower = query.lower()
+    flags = _classify(query)
     
     # 場景識別
     gaming_keywords = ["遊戲", "gaming", "電競", "遊戲用", "玩遊戲", "game", "fps", "moba", 
@@ -112,12 +149,12 @@ def test_multichat_trigger(query: str) -> tuple:
         if keyword in query_lower:
             print(f"  ✅ 找到比較查詢關鍵字: '{keyword}'")
             # 檢查是否為具體系列比較
-            is_series_comp = test_is_series_comparison(query)
+            is_series_comp = test_is_series_comparison(query, flags)
             if is_series_comp:
                 print(f"  ➡️ 結果: 不觸發多輪對話 (系列比較查詢)")
                 return False, None
             else:
-                has_specific = test_has_specific_models(query)
+                has_specific = test_has_specific_models(query, flags)
                 if not has_specific:
                     print(f"  ➡️ 結果: 觸發多輪對話 (模糊比較查詢)")
                     return True, detected_scenario
@@ -139,7 +176,7 @@ def test_multichat_trigger(query: str) -> tuple:
     for keyword in scenario_keywords:
         if keyword in query_lower:
             print(f"  ✅ 找到場景關鍵字: '{keyword}'")
-            has_specific = test_has_specific_models(query)
+            has_specific = test_has_specific_models(query, flags)
             if not has_specific:
                 print(f"  ➡️ 結果: 觸發多輪對話 (使用場景查詢)")
                 return True, detected_scenario
@@ -162,6 +199,8 @@ def main():
         "請比較819系列顯示螢幕規格有什麼不同？"
     ]
     
+    test_series_comparison_after_model_name()
+    
     results = []
     for query in test_queries:
         should_trigger, scenario = test_multichat_trigger(query)
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+配置檔讀寫共用函式
+entity_manager、keywords_manager 與 config_manager 共用的 JSON 讀取、序列化與寫入
+"""
+
+import os
+import json
+import hashlib
+import mmap
+from pathlib import Path
+from typing import Any, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import json_stream
+except ImportError:
+    json_stream = None
+
+# 設定檔超過此大小且有 json_stream 時改用串流解析，只建立需要的子樹
+STREAM_LOAD_MIN_BYTES = 8 * 1024 * 1024
+
+def json_loads(raw: bytes) -> Any:
+    """解析JSON，有 orjson 時使用 orjson"""
+    if orjson:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+def json_dumps(data: Any) -> bytes:
+    """序列化為縮排2格、以換行結尾的UTF-8 JSON；有無 orjson 輸出相同，三個管理工具存檔內容一致"""
+    if orjson:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_APPEND_NEWLINE)
+    return (json.dumps(data, ensure_ascii=False, indent=2) + "\n").encode('utf-8')
+
+def digest(raw) -> bytes:
+    """檔案內容的雜湊值，用來判斷儲存內容是否與磁碟上相同"""
+    return hashlib.blake2b(raw).digest()
+
+def load_json_file(path: Path) -> Tuple[Any, bytes]:
+    """讀取並解析JSON檔案，回傳 (資料, 內容雜湊)；有 orjson 時直接解析 mmap 映射的內容，省去 read() 複製"""
+    with open(path, 'rb') as f:
+        if orjson:
+            try:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except (ValueError, OSError):
+                mm = None  # 空檔案或平台不支援 mmap，改用一般讀取
+            if mm is not None:
+                with mm, memoryview(mm) as view:
+                    return orjson.loads(view), digest(view)
+        raw = f.read()
+        return json_loads(raw), digest(raw)
+
+def load_config_section(path: Path, key: str) -> Tuple[Any, Optional[bytes]]:
+    """讀取設定檔中 key 的子樹，回傳 (子樹, 內容雜湊)
+
+    大型設定檔以 json_stream 串流解析，其他頂層鍵不會被建立成物件；此時不計算雜湊（回傳 None），
+    第一次儲存一律寫入
+    """
+    if json_stream and path.stat().st_size >= STREAM_LOAD_MIN_BYTES:
+        with open(path, 'rb') as f:
+            root = json_stream.load(f)
+            try:
+                return json_stream.to_standard_types(root[key]), None
+            except KeyError:
+                return {}, None
+    data, content_digest = load_json_file(path)
+    return data.get(key, {}), content_digest
+
+def atomic_write_bytes(path: Path, data: bytes):
+    """先寫入同目錄暫存檔再以 os.replace 取代，避免寫入中斷留下不完整的配置檔"""
+    tmp_path = path.with_suffix(path.suffix + '.tmp')
+    try:
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
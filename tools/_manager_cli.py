@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""
+配置管理工具共用的命令列流程
+entity_manager 與 keywords_manager 只定義各自的命令與 _dispatch，單次執行與互動模式由此處理
+"""
+
+import argparse
+import shlex
+import sys
+from typing import Any, Callable, Tuple
+
+# _dispatch(manager, args) -> 是否成功
+Dispatch = Callable[[Any, argparse.Namespace], bool]
+
+def build_parser(description: str) -> Tuple[argparse.ArgumentParser, Any]:
+    """建立含 --shell 選項的命令列解析器，回傳 (parser, subparsers)"""
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('--shell', action='store_true', help='互動模式：從標準輸入逐行讀取命令，設定只載入一次')
+    subparsers = parser.add_subparsers(dest='command', help='可用命令')
+    return parser, subparsers
+
+def run_shell(parser: argparse.ArgumentParser, manager: Any, dispatch: Dispatch, prompt: str):
+    """互動模式：逐行讀取命令並共用同一個管理器，設定與快取只建立一次，僅在內容變更時存檔"""
+    manager.backup_once = True
+    prompt = prompt if sys.stdin.isatty() else ''
+    while True:
+        try:
+            line = input(prompt)
+        except EOFError:
+            break
+        try:
+            argv = shlex.split(line)
+        except ValueError as e:
+            print(f"❌ 無法解析命令: {e}")
+            continue
+        if not argv:
+            continue
+        if argv[0] in ('exit', 'quit'):
+            break
+        try:
+            args = parser.parse_args(argv)
+        except SystemExit:
+            continue  # argparse 已輸出錯誤或說明
+        if args.shell or not args.command:
+            parser.print_help()
+            continue
+        dispatch(manager, args)
+
+def run_cli(parser: argparse.ArgumentParser, manager_factory: Callable[[], Any],
+            dispatch: Dispatch, prompt: str):
+    """解析命令列參數並執行單一命令，或以 --shell 進入互動模式；命令失敗時以狀態碼 1 結束"""
+    args = parser.parse_args()
+
+    if args.shell:
+        run_shell(parser, manager_factory(), dispatch, prompt)
+        return
+
+    if not args.command:
+        parser.print_help()
+        return
+
+    if not dispatch(manager_factory(), args):
+        sys.exit(1)
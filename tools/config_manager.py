@@ -6,90 +6,215 @@ Configuration Manager CLI
 """
 
 import os
+import re
 import sys
-import json
 import argparse
+import unicodedata
+from datetime import datetime
 from pathlib import Path
-from tabulate import tabulate
-from typing import Dict, Any, List
+from typing import Dict, Any, List, TextIO, Tuple
+import shutil
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
 
 # 添加專案根目錄到路徑
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
+from tools._config_io import atomic_write_bytes, json_dumps, json_loads
+
 # 設定檔路徑
 ENTITY_PATTERNS_PATH = project_root / "libs/services/sales_assistant/prompts/entity_patterns.json"
 QUERY_KEYWORDS_PATH = project_root / "libs/services/sales_assistant/prompts/query_keywords.json"
 BACKUP_DIR = project_root / "tools/backups"
+# 每種配置保留的備份數量上限，超過時刪除最舊的備份；
+# entity_manager / keywords_manager 以相同檔名格式寫入同一目錄，三個工具共用此上限
+MAX_BACKUPS_PER_TYPE = 20
+
+# 驗證工具的子程序命令（無法直接匯入驗證函式時使用）
+_ENTITY_VALIDATOR_CMD = (sys.executable, str(project_root / "tools/entity_manager.py"), "validate")
+_KEYWORDS_VALIDATOR_CMD = (sys.executable, str(project_root / "tools/keywords_manager.py"), "validate")
+
+def _display_width(text: str) -> int:
+    """計算字串在終端機上的顯示寬度（全形字元佔兩格）"""
+    return sum(2 if unicodedata.east_asian_width(ch) in ('W', 'F') else 1 for ch in text)
+
+def _format_grid(rows: List[List[Any]], headers: List[str]) -> str:
+    """以 grid 樣式格式化表格（版面同 tabulate 的 grid 格式，文字靠左對齊）"""
+    cells = [[str(c) for c in row] for row in rows]
+    widths = [
+        max(_display_width(c) for c in column)
+        for column in zip(headers, *cells)
+    ]
+    
+    def format_row(row: List[str]) -> str:
+        padded = (c + ' ' * (w - _display_width(c)) for c, w in zip(row, widths))
+        return '| ' + ' | '.join(padded) + ' |'
+    
+    border = '+' + '+'.join('-' * (w + 2) for w in widths) + '+'
+    header_border = '+' + '+'.join('=' * (w + 2) for w in widths) + '+'
+    lines = [border, format_row(headers), header_border]
+    for row in cells:
+        lines.append(format_row(row))
+        lines.append(border)
+    return '\n'.join(lines)
+
+def _trie_to_regex(node: Dict[str, Any]) -> List[str]:
+    """將字首樹節點轉為正則分支列表，葉節點字元合併為字元類別"""
+    leaf_chars = []
+    branches = []
+    for ch, child in sorted(node.items()):
+        if not ch:
+            continue
+        if child == {'': {}}:
+            leaf_chars.append(re.escape(ch))
+            continue
+        sub = _trie_to_regex(child)
+        if '' in child and len(sub) == 1 and sub[0].startswith('[') and len(child) > 2:
+            branches.append(f"{re.escape(ch)}{sub[0]}?")
+        elif '' in child:
+            branches.append(f"{re.escape(ch)}(?:{'|'.join(sub)})?")
+        elif len(sub) == 1:
+            branches.append(re.escape(ch) + sub[0])
+        else:
+            branches.append(f"{re.escape(ch)}(?:{'|'.join(sub)})")
+    
+    if len(leaf_chars) == 1:
+        branches.append(leaf_chars[0])
+    elif leaf_chars:
+        branches.append(f"[{''.join(leaf_chars)}]")
+    return branches
+
+def _compact_alternation(words) -> str:
+    """以字首樹合併共同字首，產生精簡的正則交替式（如 8(?:19|39)|9(?:28|58)）"""
+    trie: Dict[str, Any] = {}
+    for word in sorted(set(words)):
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[''] = {}
+    return '|'.join(_trie_to_regex(trie))
+
+def _parse_backup_name(filename: str) -> Tuple[str, str]:
+    """解析備份檔名，回傳 (配置類型, 時間戳記)
+    
+    新格式為 <type>__<timestamp>.json，舊格式為 <type>_<YYYYmmdd>_<HHMMSS>.json
+    """
+    stem = filename[:-len('.json')] if filename.endswith('.json') else filename
+    if '__' in stem:
+        config_type, timestamp = stem.rsplit('__', 1)
+        return config_type, timestamp
+    parts = stem.rsplit('_', 2)
+    return parts[0], '_'.join(parts[1:])
+
+def _copy_file(src: Path, dst: Path):
+    """複製檔案並保留修改時間；支援 os.sendfile 時於核心內直接複製"""
+    if not hasattr(os, 'sendfile'):
+        shutil.copy2(src, dst)
+        return
+    
+    src_fd = os.open(src, os.O_RDONLY)
+    try:
+        st = os.fstat(src_fd)
+        dst_fd = os.open(dst, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            offset = 0
+            while offset < st.st_size:
+                sent = os.sendfile(dst_fd, src_fd, offset, st.st_size - offset)
+                if sent == 0:
+                    break
+                offset += sent
+        finally:
+            os.close(dst_fd)
+    except OSError:
+        shutil.copy2(src, dst)
+        return
+    finally:
+        os.close(src_fd)
+    os.utime(dst, ns=(st.st_atime_ns, st.st_mtime_ns))
 
 class ConfigManager:
     """統一配置管理器"""
     
     def __init__(self):
         self.backup_dir = BACKUP_DIR
-        self.backup_dir.mkdir(exist_ok=True)
         
         self.config_files = {
             'entity_patterns': ENTITY_PATTERNS_PATH,
             'query_keywords': QUERY_KEYWORDS_PATH
         }
+        
+        # 已解析配置快取: config_type -> (檔案 mtime_ns, 配置內容)
+        self._cache: Dict[str, Tuple[int, Dict[str, Any]]] = {}
     
-    def _load_config(self, config_type: str) -> Dict[str, Any]:
-        """載入指定類型的配置"""
+    def _load_config(self, config_type: str, st: os.stat_result = None) -> Dict[str, Any]:
+        """載入指定類型的配置，檔案未變更時直接使用快取；可傳入已取得的 stat 結果"""
         if config_type not in self.config_files:
             return {}
         
+        config_path = self.config_files[config_type]
         try:
-            with open(self.config_files[config_type], 'r', encoding='utf-8') as f:
-                return json.load(f)
+            mtime = (st or config_path.stat()).st_mtime_ns
+            cached = self._cache.get(config_type)
+            if cached and cached[0] == mtime:
+                return cached[1]
+            
+            data = json_loads(config_path.read_bytes())
+            self._cache[config_type] = (mtime, data)
+            return data
         except Exception as e:
             print(f"❌ 載入 {config_type} 配置失敗: {e}")
             return {}
     
+    def _invalidate_config(self, config_type: str):
+        """清除指定配置的快取"""
+        self._cache.pop(config_type, None)
+    
     def status(self):
         """顯示配置檔案狀態"""
         print("🔍 Sales Assistant 配置檔案狀態:\n")
         
         table_data = []
         for config_name, config_path in self.config_files.items():
-            if config_path.exists():
-                try:
-                    data = self._load_config(config_name)
-                    size = config_path.stat().st_size
-                    
-                    if config_name == 'entity_patterns':
-                        entity_count = len(data.get('entity_patterns', {}))
-                        status = f"✅ {entity_count} 個實體類型"
-                    elif config_name == 'query_keywords':
-                        intent_count = len(data.get('intent_keywords', {}))
-                        status = f"✅ {intent_count} 個意圖"
-                    else:
-                        status = "✅ 存在"
-                    
-                    table_data.append([
-                        config_name,
-                        str(config_path),
-                        f"{size} bytes",
-                        status
-                    ])
-                except Exception as e:
-                    table_data.append([
-                        config_name,
-                        str(config_path),
-                        "錯誤",
-                        f"❌ {str(e)[:50]}..."
-                    ])
-            else:
+            try:
+                st = config_path.stat()
+            except FileNotFoundError:
                 table_data.append([
                     config_name,
                     str(config_path),
                     "不存在",
                     "❌ 檔案不存在"
                 ])
+                continue
+            
+            try:
+                data = self._load_config(config_name, st)
+                
+                if config_name == 'entity_patterns':
+                    entity_count = len(data.get('entity_patterns', {}))
+                    status = f"✅ {entity_count} 個實體類型"
+                elif config_name == 'query_keywords':
+                    intent_count = len(data.get('intent_keywords', {}))
+                    status = f"✅ {intent_count} 個意圖"
+                else:
+                    status = "✅ 存在"
+                
+                table_data.append([
+                    config_name,
+                    str(config_path),
+                    f"{st.st_size} bytes",
+                    status
+                ])
+            except Exception as e:
+                table_data.append([
+                    config_name,
+                    str(config_path),
+                    "錯誤",
+                    f"❌ {str(e)[:50]}..."
+                ])
         
         headers = ['配置類型', '檔案路徑', '大小', '狀態']
-        print(tabulate(table_data, headers=headers, tablefmt='grid'))
+        print(_format_grid(table_data, headers))
     
     def sync_modeltypes(self):
         """同步數據庫中的modeltype到配置檔案"""
@@ -100,25 +225,41 @@ class ConfigManager:
             from config import DB_PATH
             import duckdb
             
-            conn = duckdb.connect(str(DB_PATH))
-            result = conn.execute('SELECT DISTINCT modeltype FROM specs ORDER BY modeltype').fetchall()
-            conn.close()
+            # 僅讀取資料，以唯讀模式開啟
+            conn = duckdb.connect(str(DB_PATH), read_only=True)
+            try:
+                # 由 DuckDB 完成去重與排序，只回傳單一列表
+                result = conn.execute("""
+                    SELECT list(DISTINCT modeltype ORDER BY modeltype)
+                    FROM specs
+                    WHERE modeltype IS NOT NULL
+                """).fetchone()
+            finally:
+                conn.close()
             
-            modeltypes = [row[0] for row in result]
-            print(f"📋 從數據庫獲取到的modeltype: {modeltypes}")
+            modeltypes = set(result[0] or [])
+            print(f"📋 從數據庫獲取到的modeltype: {sorted(modeltypes)}")
             
             # 更新entity_patterns.json
             entity_data = self._load_config('entity_patterns')
             if 'entity_patterns' in entity_data and 'MODEL_TYPE' in entity_data['entity_patterns']:
+                model_type_config = entity_data['entity_patterns']['MODEL_TYPE']
                 # 構建新的pattern
-                pattern = f"\\\\b(?:{'|'.join(modeltypes)})\\\\b"
-                entity_data['entity_patterns']['MODEL_TYPE']['patterns'] = [pattern]
-                entity_data['entity_patterns']['MODEL_TYPE']['examples'] = modeltypes
+                pattern = rf"\b(?:{_compact_alternation(modeltypes)})\b"
+                
+                # modeltype 與模式皆未變更時不需備份與重寫
+                if (modeltypes == set(model_type_config.get('examples', []))
+                        and model_type_config.get('patterns') == [pattern]):
+                    print("✅ MODEL_TYPE 模式已是最新，無需更新")
+                    return True
+                
+                model_type_config['patterns'] = [pattern]
+                model_type_config['examples'] = sorted(modeltypes)
                 
                 # 儲存更新
                 self._create_backup('entity_patterns')
-                with open(ENTITY_PATTERNS_PATH, 'w', encoding='utf-8') as f:
-                    json.dump(entity_data, f, ensure_ascii=False, indent=2)
+                atomic_write_bytes(ENTITY_PATTERNS_PATH, json_dumps(entity_data))
+                self._invalidate_config('entity_patterns')
                 
                 print(f"✅ 已更新 entity_patterns.json 中的 MODEL_TYPE 模式")
                 print(f"🎯 新模式: {pattern}")
@@ -126,48 +267,60 @@ class ConfigManager:
             return True
             
         except Exception as e:
+            # 快取中的配置可能已被修改但未寫回檔案
+            self._invalidate_config('entity_patterns')
             print(f"❌ 同步失敗: {e}")
             return False
     
+    def _run_validators(self) -> List[Tuple[str, bool, str]]:
+        """執行各配置檔的驗證，回傳 [(配置檔名稱, 是否通過, 驗證輸出)]"""
+        try:
+            from tools.entity_manager import validate as entity_validate
+            from tools.keywords_manager import validate as keywords_validate
+        except ImportError:
+            return self._run_validator_processes()
+        
+        # 直接在同一程序內呼叫驗證函式，省去啟動子程序的成本
+        return [
+            ("entity_patterns.json", *entity_validate()),
+            ("query_keywords.json", *keywords_validate()),
+        ]
+    
+    def _run_validator_processes(self) -> List[Tuple[str, bool, str]]:
+        """以子程序執行驗證工具；兩個驗證程序互不相依，同時執行"""
+        validators = [
+            ("entity_patterns.json", _ENTITY_VALIDATOR_CMD),
+            ("query_keywords.json", _KEYWORDS_VALIDATOR_CMD),
+        ]
+        with ThreadPoolExecutor(max_workers=len(validators)) as executor:
+            futures = [
+                executor.submit(subprocess.run, cmd, capture_output=True, text=True, encoding='utf-8')
+                for _, cmd in validators
+            ]
+            processes = [future.result() for future in futures]
+        
+        return [
+            (config_name, process.returncode == 0, process.stdout)
+            for (config_name, _), process in zip(validators, processes)
+        ]
+    
     def validate_all(self):
         """驗證所有配置檔案"""
         print("🔍 驗證所有配置檔案...\n")
         
-        all_valid = True
+        results = self._run_validators()
         
-        # 驗證entity_patterns
-        print("1. 驗證 entity_patterns.json:")
-        result = subprocess.run([
-            sys.executable, 
-            str(project_root / "tools/entity_manager.py"), 
-            "validate"
-        ], capture_output=True, text=True, encoding='utf-8')
-        
-        if result.returncode == 0:
-            print("✅ entity_patterns.json 驗證通過")
-        else:
-            print("❌ entity_patterns.json 驗證失敗")
-            print(result.stdout)
-            all_valid = False
-        
-        print()
-        
-        # 驗證query_keywords
-        print("2. 驗證 query_keywords.json:")
-        result = subprocess.run([
-            sys.executable, 
-            str(project_root / "tools/keywords_manager.py"), 
-            "validate"
-        ], capture_output=True, text=True, encoding='utf-8')
-        
-        if result.returncode == 0:
-            print("✅ query_keywords.json 驗證通過")
-        else:
-            print("❌ query_keywords.json 驗證失敗")
-            print(result.stdout)
-            all_valid = False
-        
-        print()
+        all_valid = True
+        for i, (config_name, valid, output) in enumerate(results, 1):
+            print(f"{i}. 驗證 {config_name}:")
+            if valid:
+                print(f"✅ {config_name} 驗證通過")
+            else:
+                print(f"❌ {config_name} 驗證失敗")
+                print(output)
+                all_valid = False
+            
+            print()
         
         if all_valid:
             print("🎉 所有配置檔案驗證通過！")
@@ -180,27 +333,53 @@ class ConfigManager:
         """備份所有配置檔案"""
         print("📋 備份所有配置檔案...")
         
-        for config_name in self.config_files.keys():
-            self._create_backup(config_name)
+        # 各配置檔的備份互不相依，同時複製後再依序輸出結果
+        with ThreadPoolExecutor(max_workers=len(self.config_files)) as executor:
+            messages = list(executor.map(self._backup_config, self.config_files))
+        for message in messages:
+            print(message)
         
         print("✅ 備份完成")
     
-    def _create_backup(self, config_type: str):
+    def _create_backup(self, config_type: str, prune: bool = True):
         """建立備份檔案"""
+        print(self._backup_config(config_type, prune))
+    
+    def _backup_config(self, config_type: str, prune: bool = True) -> str:
+        """複製配置檔到備份目錄，回傳結果訊息；prune=False 時不清理舊備份"""
         if config_type not in self.config_files:
-            print(f"❌ 未知配置類型: {config_type}")
-            return
+            return f"❌ 未知配置類型: {config_type}"
         
-        from datetime import datetime
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        backup_file = self.backup_dir / f"{config_type}_{timestamp}.json"
+        backup_file = self.backup_dir / f"{config_type}__{timestamp}.json"
         
         try:
-            import shutil
-            shutil.copy2(self.config_files[config_type], backup_file)
-            print(f"📋 已建立備份: {backup_file}")
+            # 備份目錄只在實際建立備份時才需要
+            self.backup_dir.mkdir(parents=True, exist_ok=True)
+            _copy_file(self.config_files[config_type], backup_file)
+            if prune:
+                self._prune_backups(config_type)
+            return f"📋 已建立備份: {backup_file}"
         except Exception as e:
-            print(f"⚠️  建立 {config_type} 備份失敗: {e}")
+            return f"⚠️  建立 {config_type} 備份失敗: {e}"
+    
+    def _prune_backups(self, config_type: str, max_keep: int = MAX_BACKUPS_PER_TYPE, keep: Path = None):
+        """只保留指定配置最新的 max_keep 份備份（含其他工具寫入的同類型備份）；keep 指定的檔案不刪除"""
+        # 備份會保留來源檔的修改時間，因此以檔名中的時間戳記判斷新舊
+        backups = []
+        with os.scandir(self.backup_dir) as it:
+            for entry in it:
+                if not entry.name.endswith('.json'):
+                    continue
+                backup_type, timestamp = _parse_backup_name(entry.name)
+                if backup_type == config_type:
+                    backups.append((timestamp, entry.path))
+        
+        backups.sort(reverse=True)
+        keep_path = os.path.abspath(keep) if keep is not None else None
+        for _, path in backups[max_keep:]:
+            if os.path.abspath(path) != keep_path:
+                os.unlink(path)
     
     def list_backups(self):
         """列出所有備份檔案"""
@@ -208,29 +387,32 @@ class ConfigManager:
             print("❌ 備份目錄不存在")
             return
         
-        backup_files = list(self.backup_dir.glob("*.json"))
+        # DirEntry.stat() 會重用目錄掃描時取得的資訊，不需為每個檔案額外建立 Path
+        with os.scandir(self.backup_dir) as it:
+            backup_files = [
+                (entry.name, entry.stat())
+                for entry in it
+                if entry.name.endswith('.json') and entry.is_file()
+            ]
         if not backup_files:
             print("📂 沒有找到備份檔案")
             return
         
         # 按修改時間排序
-        backup_files.sort(key=lambda x: x.stat().st_mtime, reverse=True)
+        backup_files.sort(key=lambda x: x[1].st_mtime, reverse=True)
         
-        table_data = []
-        for backup_file in backup_files:
-            stat = backup_file.stat()
-            from datetime import datetime
-            mtime = datetime.fromtimestamp(stat.st_mtime)
-            
-            table_data.append([
-                backup_file.name,
+        table_data = [
+            [
+                name,
                 f"{stat.st_size} bytes",
-                mtime.strftime("%Y-%m-%d %H:%M:%S")
-            ])
+                datetime.fromtimestamp(stat.st_mtime).strftime("%Y-%m-%d %H:%M:%S")
+            ]
+            for name, stat in backup_files
+        ]
         
         headers = ['備份檔案', '大小', '建立時間']
         print("\n📋 備份檔案列表:")
-        print(tabulate(table_data, headers=headers, tablefmt='grid'))
+        print(_format_grid(table_data, headers))
     
     def restore_backup(self, backup_file: str):
         """從備份檔案還原配置"""
@@ -240,23 +422,20 @@ class ConfigManager:
             return False
         
         # 判斷配置類型
-        config_type = None
-        for ct in self.config_files.keys():
-            if backup_file.startswith(ct):
-                config_type = ct
-                break
+        config_type, _ = _parse_backup_name(backup_file)
         
-        if not config_type:
+        if config_type not in self.config_files:
             print(f"❌ 無法識別備份檔案類型: {backup_file}")
             return False
         
         try:
-            # 建立當前配置的備份
-            self._create_backup(config_type)
+            # 建立當前配置的備份；舊備份待還原完成後才清理，避免刪除還原來源
+            self._create_backup(config_type, prune=False)
             
             # 還原備份
-            import shutil
             shutil.copy2(backup_path, self.config_files[config_type])
+            self._invalidate_config(config_type)
+            self._prune_backups(config_type, keep=backup_path)
             print(f"✅ 已從 {backup_file} 還原 {config_type} 配置")
             return True
             
@@ -264,38 +443,37 @@ class ConfigManager:
             print(f"❌ 還原失敗: {e}")
             return False
     
-    def summary(self):
-        """顯示配置摘要"""
-        print("📊 Sales Assistant 配置摘要:\n")
+    def summary(self, file: TextIO = None):
+        """顯示配置摘要；指定 file 時直接寫入該檔案"""
+        print("📊 Sales Assistant 配置摘要:\n", file=file)
         
         # Entity Patterns 摘要
         entity_data = self._load_config('entity_patterns')
         entity_patterns = entity_data.get('entity_patterns', {})
         
-        print("🎯 實體模式 (Entity Patterns):")
+        print("🎯 實體模式 (Entity Patterns):", file=file)
         for entity_type, config in entity_patterns.items():
             pattern_count = len(config.get('patterns', []))
             example_count = len(config.get('examples', []))
-            print(f"  • {entity_type}: {pattern_count} 個模式, {example_count} 個範例")
+            print(f"  • {entity_type}: {pattern_count} 個模式, {example_count} 個範例", file=file)
         
-        print()
+        print(file=file)
         
         # Query Keywords 摘要
         keywords_data = self._load_config('query_keywords')
         intent_keywords = keywords_data.get('intent_keywords', {})
         
-        print("🔍 查詢關鍵字 (Query Keywords):")
+        print("🔍 查詢關鍵字 (Query Keywords):", file=file)
         total_keywords = 0
         for intent_name, config in intent_keywords.items():
             keyword_count = len(config.get('keywords', []))
             total_keywords += keyword_count
-            print(f"  • {intent_name}: {keyword_count} 個關鍵字")
+            print(f"  • {intent_name}: {keyword_count} 個關鍵字", file=file)
         
-        print(f"\n📈 總計: {len(entity_patterns)} 個實體類型, {len(intent_keywords)} 個意圖, {total_keywords} 個關鍵字")
+        print(f"\n📈 總計: {len(entity_patterns)} 個實體類型, {len(intent_keywords)} 個意圖, {total_keywords} 個關鍵字", file=file)
     
     def export_config(self, format: str = 'json'):
         """匯出完整配置"""
-        from datetime import datetime
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         
         if format == 'json':
@@ -304,23 +482,14 @@ class ConfigManager:
                 export_data[config_name] = self._load_config(config_name)
             
             filename = f"sales_assistant_config_{timestamp}.json"
-            with open(filename, 'w', encoding='utf-8') as f:
-                json.dump(export_data, f, ensure_ascii=False, indent=2)
+            Path(filename).write_bytes(json_dumps(export_data))
             
             print(f"✅ 已匯出完整配置到 {filename}")
         
         elif format == 'summary':
             filename = f"config_summary_{timestamp}.txt"
             with open(filename, 'w', encoding='utf-8') as f:
-                # 重定向stdout到檔案
-                import io
-                old_stdout = sys.stdout
-                sys.stdout = buffer = io.StringIO()
-                
-                self.summary()
-                
-                sys.stdout = old_stdout
-                f.write(buffer.getvalue())
+                self.summary(file=f)
             
             print(f"✅ 已匯出配置摘要到 {filename}")
 
@@ -9,25 +9,98 @@ import argparse
 import sys
 import os
 import json
+import codecs
+import shutil
+import tempfile
+import importlib.util
+from itertools import chain
 from pathlib import Path
-from typing import List, Dict, Any, Optional, Tuple
+from typing import TYPE_CHECKING, List, Dict, Any, Optional, Tuple
 import duckdb
-from tabulate import tabulate
-import pandas as pd
+
+if TYPE_CHECKING:
+    import pyarrow
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# 匯出時每批讀取的列數，記憶體用量固定為一批
+EXPORT_BATCH_ROWS = 50_000
+
+# 檔案大小顯示單位
+FILE_SIZE_UNITS = ('B', 'KB', 'MB', 'GB', 'TB')
+
+# 搜尋結果顯示的主要欄位
+SEARCH_DISPLAY_COLUMNS = ('modelname', 'modeltype', 'cpu', 'memory', 'storage', 'lcd')
+
+# 經Arrow轉換後與 fetchall() 得到相同Python值的DuckDB型別；
+# 其他型別（HUGEINT、INTERVAL、UUID、MAP及巢狀型別等）顯示時改以 fetchall() 取值
+ARROW_DISPLAY_TYPES = frozenset({
+    'boolean', 'tinyint', 'smallint', 'integer', 'bigint',
+    'utinyint', 'usmallint', 'uinteger', 'ubigint', 'float', 'double', 'decimal',
+    'varchar', 'blob', 'date', 'time', 'timestamp',
+})
+
+# COPY TO 支援的匯出格式與選項
+COPY_FORMAT_OPTIONS = {
+    'csv': "FORMAT CSV, HEADER",
+    'json': "FORMAT JSON, ARRAY true",
+}
+
+
+def _to_arrow(result) -> "pyarrow.Table":
+    """將查詢結果直接取為Arrow表格（DuckDB 1.4+ 改名為 to_arrow_table）"""
+    fetch = getattr(result, 'to_arrow_table', None) or result.fetch_arrow_table
+    return fetch()
+
+
+def _to_arrow_reader(result, batch_size: int) -> "pyarrow.RecordBatchReader":
+    """將查詢結果取為逐批讀取的Arrow串流（DuckDB 1.4+ 改名為 to_arrow_reader）"""
+    fetch = getattr(result, 'to_arrow_reader', None) or result.fetch_record_batch
+    return fetch(batch_size)
+
+
+def _arrow_rows(table: "pyarrow.Table") -> List[Tuple]:
+    """Arrow表格逐欄轉為Python值後組成列，不為每列建立字典"""
+    return list(zip(*(column.to_pylist() for column in table.columns)))
+
+
+def _tabulate(*args, **kwargs) -> str:
+    """延遲載入 tabulate，只有需要表格輸出的命令才載入"""
+    from tabulate import tabulate
+    return tabulate(*args, **kwargs)
+
+
+def _json_dumps(record: Dict[str, Any]) -> bytes:
+    """將單筆記錄序列化為UTF-8 JSON，有 orjson 時使用 orjson"""
+    if orjson:
+        return orjson.dumps(record)
+    return json.dumps(record, ensure_ascii=False).encode('utf-8')
 
 
 class DuckDBQueryCLI:
     """DuckDB查詢CLI工具類"""
 
-    def __init__(self, db_path: str):
+    def __init__(self, db_path: str, threads: Optional[int] = None,
+                 memory_limit: Optional[str] = None):
         """
         初始化DuckDB查詢工具
         
         Args:
             db_path: DuckDB資料庫檔案路徑
+            threads: 查詢平行執行緒數（預設為CPU核心數）
+            memory_limit: DuckDB記憶體上限，例如 '4GB'（預設由DuckDB決定）
         """
         self.db_path = db_path
+        self.threads = threads or os.cpu_count() or 1
+        self.memory_limit = memory_limit
         self.conn = None
+        # DESCRIBE 結果快取：{表格名稱: 欄位資訊}
+        self._schema_cache: Dict[str, List[Tuple]] = {}
+        # 分頁查詢的prepared statement：{(表格名稱, 欄位): statement名稱}
+        self._prepared_pages: Dict[Tuple[str, Tuple[str, ...]], str] = {}
         
     def connect(self) -> bool:
         """
@@ -41,8 +114,11 @@ class DuckDBQueryCLI:
                 print(f"❌ 錯誤：找不到資料庫檔案 '{self.db_path}'")
                 return False
             
-            # 使用read_only模式確保安全
-            self.conn = duckdb.connect(self.db_path, read_only=True)
+            # 使用read_only模式確保安全；掃描與彙總依執行緒數平行執行
+            config = {'threads': self.threads}
+            if self.memory_limit:
+                config['memory_limit'] = self.memory_limit
+            self.conn = duckdb.connect(self.db_path, read_only=True, config=config)
             print(f"✅ 成功連接到DuckDB: {self.db_path}")
             return True
             
@@ -55,8 +131,16 @@ class DuckDBQueryCLI:
         if self.conn:
             self.conn.close()
             self.conn = None
+        self._schema_cache.clear()
+        self._prepared_pages.clear()
+    
+    def _require_conn(self) -> duckdb.DuckDBPyConnection:
+        """取得目前連接，未連接時拋出 duckdb.ConnectionException"""
+        if not self.conn:
+            raise duckdb.ConnectionException("資料庫未連接")
+        return self.conn
     
-    def execute_query(self, query: str, params: tuple = ()) -> Optional[List[Tuple]]:
+    def execute_query(self, query: str, params: tuple = ()) -> List[Tuple]:
         """
         執行SQL查詢
         
@@ -65,24 +149,63 @@ class DuckDBQueryCLI:
             params: 查詢參數
             
         Returns:
-            查詢結果或None（如果出錯）
+            查詢結果（無資料時為空列表）
+            
+        Raises:
+            duckdb.Error: 未連接或查詢執行失敗
         """
-        if not self.conn:
-            print("❌ 資料庫未連接")
-            return None
+        return self._require_conn().execute(query, params).fetchall()
+    
+    def _describe(self, table_name: str) -> List[Tuple]:
+        """
+        獲取表格欄位資訊，同一表格只查詢一次
+        
+        Args:
+            table_name: 表格名稱
             
-        try:
-            if params:
-                result = self.conn.execute(query, params).fetchall()
-            else:
-                result = self.conn.execute(query).fetchall()
-                
-            return result
+        Returns:
+            DESCRIBE 結果
             
-        except Exception as e:
-            print(f"❌ 查詢執行失敗: {e}")
-            print(f"   SQL: {query}")
-            return None
+        Raises:
+            duckdb.Error: 查詢失敗（失敗結果不快取）
+        """
+        columns_result = self._schema_cache.get(table_name)
+        if columns_result is None:
+            columns_result = self.execute_query(f"DESCRIBE {table_name}")
+            self._schema_cache[table_name] = columns_result
+        return columns_result
+    
+    def execute_query_arrow(self, query: str, params: tuple = ()) -> "pyarrow.Table":
+        """
+        執行SQL查詢並以Arrow表格回傳，避免逐列轉成Python tuple
+        
+        Args:
+            query: SQL查詢語句
+            params: 查詢參數
+            
+        Returns:
+            Arrow表格（無資料時 num_rows 為 0）
+            
+        Raises:
+            duckdb.Error: 未連接或查詢執行失敗
+        """
+        return _to_arrow(self._require_conn().execute(query, params))
+    
+    def _fetch_display(self, query: str, params: tuple = ()) -> Tuple[List[str], List[Tuple]]:
+        """
+        執行SQL查詢並取得顯示用的欄位名稱與資料列
+        
+        結果全為 ARROW_DISPLAY_TYPES 型別時以Arrow逐欄轉換，否則逐列 fetchall()，
+        兩者顯示的值相同
+        
+        Raises:
+            duckdb.Error: 未連接或查詢執行失敗
+        """
+        result = self._require_conn().execute(query, params)
+        headers = [desc[0] for desc in result.description]
+        if all(getattr(desc[1], 'id', None) in ARROW_DISPLAY_TYPES for desc in result.description):
+            return headers, _arrow_rows(_to_arrow(result))
+        return headers, result.fetchall()
     
     def get_table_info(self) -> Dict[str, Any]:
         """
@@ -90,15 +213,17 @@ class DuckDBQueryCLI:
         
         Returns:
             表格資訊字典
+            
+        Raises:
+            duckdb.Error: 查詢失敗
         """
         info = {}
         
         # 獲取所有表格
-        tables_result = self.execute_query("SHOW TABLES")
-        if not tables_result:
+        tables = [row[0] for row in self.execute_query("SHOW TABLES")]
+        if not tables:
             return info
         
-        tables = [row[0] for row in tables_result]
         info['tables'] = tables
         
         # 獲取每個表格的詳細資訊
@@ -106,22 +231,18 @@ class DuckDBQueryCLI:
             table_info = {}
             
             # 獲取欄位資訊
-            columns_result = self.execute_query(f"DESCRIBE {table}")
-            if columns_result:
-                columns = []
-                for col in columns_result:
-                    columns.append({
-                        'name': col[0],
-                        'type': col[1],
-                        'nullable': col[2] if len(col) > 2 else None
-                    })
-                table_info['columns'] = columns
-                table_info['column_count'] = len(columns)
+            columns = []
+            for col in self._describe(table):
+                columns.append({
+                    'name': col[0],
+                    'type': col[1],
+                    'nullable': col[2] if len(col) > 2 else None
+                })
+            table_info['columns'] = columns
+            table_info['column_count'] = len(columns)
             
             # 獲取記錄數
-            count_result = self.execute_query(f"SELECT COUNT(*) FROM {table}")
-            if count_result:
-                table_info['row_count'] = count_result[0][0]
+            table_info['row_count'] = self.execute_query(f"SELECT COUNT(*) FROM {table}")[0][0]
             
             info[table] = table_info
         
@@ -133,9 +254,14 @@ class DuckDBQueryCLI:
         print("=" * 50)
         print(f"資料庫路徑: {self.db_path}")
         
-        info = self.get_table_info()
+        try:
+            info = self.get_table_info()
+        except duckdb.Error as e:
+            print(f"❌ 無法獲取資料庫資訊: {e}")
+            return
+        
         if not info:
-            print("❌ 無法獲取資料庫資訊")
+            print("📭 資料庫中沒有表格")
             return
         
         print(f"資料庫大小: {self._get_file_size(self.db_path)}")
@@ -157,9 +283,11 @@ class DuckDBQueryCLI:
         print(f"\n📋 表格 '{table_name}' 結構")
         print("=" * 60)
         
-        columns_result = self.execute_query(f"DESCRIBE {table_name}")
-        if not columns_result:
-            print(f"❌ 無法獲取表格 '{table_name}' 的結構")
+        try:
+            columns_result = self._describe(table_name)
+            row_count = self.execute_query(f"SELECT COUNT(*) FROM {table_name}")[0][0]
+        except duckdb.Error as e:
+            print(f"❌ 無法獲取表格 '{table_name}' 的結構: {e}")
             return
         
         # 準備表格資料
@@ -172,16 +300,14 @@ class DuckDBQueryCLI:
                 "Yes" if len(col) > 2 and col[2] else "No"  # nullable
             ])
         
-        print(tabulate(
+        print(_tabulate(
             table_data,
             headers=["#", "欄位名稱", "資料型別", "可為空"],
             tablefmt="grid"
         ))
         
         # 顯示記錄數統計
-        count_result = self.execute_query(f"SELECT COUNT(*) FROM {table_name}")
-        if count_result:
-            print(f"\n📈 總記錄數: {count_result[0][0]:,}")
+        print(f"\n📈 總記錄數: {row_count:,}")
     
     def list_records(self, table_name: str = 'specs', limit: int = 10, offset: int = 0, 
                     columns: List[str] = None):
@@ -197,69 +323,76 @@ class DuckDBQueryCLI:
         print(f"\n📝 表格 '{table_name}' 記錄 (顯示 {offset+1}-{offset+limit})")
         print("=" * 80)
         
-        # 建構查詢
-        if columns:
-            cols_str = ", ".join(columns)
-        else:
-            cols_str = "*"
-        
-        query = f"SELECT {cols_str} FROM {table_name} LIMIT {limit} OFFSET {offset}"
-        result = self.execute_query(query)
-        
-        if not result:
-            print("❌ 查詢失敗")
+        # 同一表格與欄位組合重複使用已準備的分頁查詢，只代入LIMIT/OFFSET
+        try:
+            statement = self._prepare_page_query(table_name, columns)
+            headers, rows = self._fetch_display(f"EXECUTE {statement}({int(limit)}, {int(offset)})")
+        except duckdb.Error as e:
+            print(f"❌ 查詢失敗: {e}")
             return
         
-        if not result:
+        if not rows:
             print("📭 沒有找到記錄")
             return
         
-        # 獲取欄位名稱
-        if columns:
-            headers = columns
-        else:
-            columns_result = self.execute_query(f"DESCRIBE {table_name}")
-            headers = [col[0] for col in columns_result] if columns_result else []
+        # 欄位名稱直接取自查詢結果
+        print(_tabulate(rows, headers=headers, tablefmt="grid", maxcolwidths=30))
+        print(f"\n📊 顯示了 {len(rows)} 筆記錄")
+    
+    def _prepare_page_query(self, table_name: str, columns: Optional[List[str]]) -> str:
+        """
+        取得（必要時建立）分頁查詢的prepared statement名稱
         
-        # 顯示結果
-        print(tabulate(result, headers=headers, tablefmt="grid", maxcolwidths=30))
-        print(f"\n📊 顯示了 {len(result)} 筆記錄")
+        Args:
+            table_name: 表格名稱
+            columns: 指定顯示的欄位
+            
+        Returns:
+            prepared statement名稱
+            
+        Raises:
+            duckdb.Error: PREPARE 失敗（失敗結果不快取）
+        """
+        key = (table_name, tuple(columns or ()))
+        statement = self._prepared_pages.get(key)
+        if statement is None:
+            cols_str = ", ".join(columns) if columns else "*"
+            statement = f"page_{len(self._prepared_pages)}"
+            query = f"PREPARE {statement} AS SELECT {cols_str} FROM {table_name} LIMIT $1 OFFSET $2"
+            self.execute_query(query)
+            self._prepared_pages[key] = statement
+        return statement
     
-    def show_model(self, model_name: str, table_name: str = 'specs'):
+    def show_model(self, model_name: str, table_name: str = 'specs',
+                   fields: List[str] = None):
         """
         顯示特定型號的詳細資訊
         
         Args:
             model_name: 型號名稱
             table_name: 表格名稱
+            fields: 指定顯示的欄位（預設顯示全部欄位）
         """
         print(f"\n🔍 型號 '{model_name}' 詳細資訊")
         print("=" * 60)
         
-        query = f"SELECT * FROM {table_name} WHERE modelname = ?"
-        result = self.execute_query(query, (model_name,))
-        
-        if not result:
-            print("❌ 查詢失敗")
+        # 只讀取要顯示的欄位
+        fields_str = ", ".join(fields) if fields else "*"
+        query = f"SELECT {fields_str} FROM {table_name} WHERE modelname = ?"
+        try:
+            headers, result = self._fetch_display(query, (model_name,))
+        except duckdb.Error as e:
+            print(f"❌ 查詢失敗: {e}")
             return
         
         if not result:
             print(f"📭 找不到型號 '{model_name}'")
             return
         
-        # 獲取欄位名稱
-        columns_result = self.execute_query(f"DESCRIBE {table_name}")
-        if not columns_result:
-            print("❌ 無法獲取欄位資訊")
-            return
-        
-        headers = [col[0] for col in columns_result]
-        
-        # 垂直顯示詳細資訊
-        for record in result:
-            print(f"\n📋 記錄 {result.index(record) + 1}:")
-            for i, value in enumerate(record):
-                field_name = headers[i] if i < len(headers) else f"欄位{i+1}"
+        # 垂直顯示詳細資訊（欄位名稱取自查詢結果，不需另外查詢）
+        for idx, record in enumerate(result, 1):
+            print(f"\n📋 記錄 {idx}:")
+            for field_name, value in zip(headers, record):
                 display_value = value if value is not None and value != '' else "N/A"
                 print(f"  {field_name:15}: {display_value}")
         
@@ -278,47 +411,33 @@ class DuckDBQueryCLI:
         print("=" * 60)
         
         # 獲取所有欄位名稱
-        columns_result = self.execute_query(f"DESCRIBE {table_name}")
-        if not columns_result:
-            print("❌ 無法獲取欄位資訊")
+        try:
+            columns = [col[0] for col in self._describe(table_name)]
+        except duckdb.Error as e:
+            print(f"❌ 無法獲取欄位資訊: {e}")
             return
         
-        columns = [col[0] for col in columns_result]
-        
-        # 建構搜尋條件 - 在所有欄位中搜尋
-        conditions = []
-        for col in columns:
-            conditions.append(f"{col} LIKE ?")
+        # 只選取要顯示的主要欄位；若表格沒有這些欄位則顯示全部欄位
+        available_columns = [col for col in SEARCH_DISPLAY_COLUMNS if col in columns] or columns
         
-        where_clause = " OR ".join(conditions)
-        query = f"SELECT * FROM {table_name} WHERE {where_clause} LIMIT {limit}"
+        # 所有欄位以不可見分隔字元串接後做一次子字串比對，只需一個參數
+        query = (
+            f"SELECT {', '.join(available_columns)} FROM {table_name} "
+            f"WHERE contains(concat_ws(chr(31), *COLUMNS(*)), ?) LIMIT {limit}"
+        )
         
-        # 為每個欄位準備參數
-        params = tuple(f"%{keyword}%" for _ in columns)
-        
-        result = self.execute_query(query, params)
-        
-        if result is None:
-            print("❌ 搜尋失敗")
+        try:
+            result = self.execute_query(query, (keyword,))
+        except duckdb.Error as e:
+            print(f"❌ 搜尋失敗: {e}")
             return
         
         if not result:
             print(f"📭 沒有找到包含 '{keyword}' 的記錄")
             return
         
-        # 顯示主要欄位的搜尋結果
-        main_columns = ['modelname', 'modeltype', 'cpu', 'memory', 'storage', 'lcd']
-        available_columns = [col for col in main_columns if col in columns]
-        
-        # 提取指定欄位的資料
-        main_col_indices = [columns.index(col) for col in available_columns]
-        filtered_result = []
-        for row in result:
-            filtered_row = [row[i] for i in main_col_indices]
-            filtered_result.append(filtered_row)
-        
-        print(tabulate(
-            filtered_result,
+        print(_tabulate(
+            result,
             headers=available_columns,
             tablefmt="grid",
             maxcolwidths=25
@@ -341,52 +460,66 @@ class DuckDBQueryCLI:
         print("=" * 50)
         
         # 檢查欄位是否存在
-        columns_result = self.execute_query(f"DESCRIBE {table_name}")
-        if not columns_result:
-            print("❌ 無法獲取表格結構")
+        try:
+            available_columns = [col[0] for col in self._describe(table_name)]
+        except duckdb.Error as e:
+            print(f"❌ 無法獲取表格結構: {e}")
             return
         
-        available_columns = [col[0] for col in columns_result]
         if column_name not in available_columns:
             print(f"❌ 欄位 '{column_name}' 不存在")
             print(f"可用欄位: {', '.join(available_columns)}")
             return
         
-        # 基本統計
-        stats_queries = [
-            ("記錄總數", f"SELECT COUNT(*) FROM {table_name}"),
-            ("非空值數", f"SELECT COUNT({column_name}) FROM {table_name}"),
-            ("空值數", f"SELECT COUNT(*) FROM {table_name} WHERE {column_name} IS NULL OR {column_name} = ''"),
-            ("唯一值數", f"SELECT COUNT(DISTINCT {column_name}) FROM {table_name}")
-        ]
+        # 欄位已確認存在，加上引號避免與關鍵字衝突
+        column = '"' + column_name.replace('"', '""') + '"'
+        
+        # 基本統計 - 單次掃描計算全部彙總值
+        stats_query = f"""
+        SELECT COUNT(*),
+               COUNT({column}),
+               COUNT(*) FILTER (WHERE {column} IS NULL OR {column} = ''),
+               COUNT(DISTINCT {column})
+        FROM {table_name}
+        """
+        stat_names = ["記錄總數", "非空值數", "空值數", "唯一值數"]
         
         print("基本統計:")
-        for stat_name, query in stats_queries:
-            result = self.execute_query(query)
-            if result:
-                print(f"  {stat_name}: {result[0][0]:,}")
+        try:
+            stats = self.execute_query(stats_query)[0]
+        except duckdb.Error as e:
+            print(f"❌ 無法獲取統計資料: {e}")
+            return
+        for stat_name, value in zip(stat_names, stats):
+            print(f"  {stat_name}: {value:,}")
         
         # 前10個最常見的值
         print(f"\n'{column_name}' 前10個最常見的值:")
         top_values_query = f"""
-        SELECT {column_name}, COUNT(*) as count 
+        SELECT {column}, COUNT(*) as count 
         FROM {table_name} 
-        WHERE {column_name} IS NOT NULL AND {column_name} != ''
-        GROUP BY {column_name} 
+        WHERE {column} IS NOT NULL AND {column} != ''
+        GROUP BY {column} 
         ORDER BY count DESC 
         LIMIT 10
         """
         
-        result = self.execute_query(top_values_query)
-        if result:
-            table_data = [[i+1, value, count] for i, (value, count) in enumerate(result)]
-            print(tabulate(
-                table_data,
-                headers=["排名", "值", "出現次數"],
-                tablefmt="grid"
-            ))
-        else:
-            print("❌ 無法獲取統計資料")
+        try:
+            result = self.execute_query(top_values_query)
+        except duckdb.Error as e:
+            print(f"❌ 無法獲取統計資料: {e}")
+            return
+        
+        if not result:
+            print("📭 沒有非空值")
+            return
+        
+        table_data = [[i+1, value, count] for i, (value, count) in enumerate(result)]
+        print(_tabulate(
+            table_data,
+            headers=["排名", "值", "出現次數"],
+            tablefmt="grid"
+        ))
     
     def execute_sql(self, sql: str):
         """
@@ -400,30 +533,19 @@ class DuckDBQueryCLI:
         print(f"SQL: {sql}")
         print("-" * 50)
         
-        result = self.execute_query(sql)
-        
-        if result is None:
-            print("❌ 查詢執行失敗")
+        try:
+            headers, rows = self._fetch_display(sql)
+        except duckdb.Error as e:
+            print(f"❌ 查詢執行失敗: {e}")
             return
         
-        if not result:
+        if not rows:
             print("📭 查詢結果為空")
             return
         
-        # 嘗試獲取欄位名稱（這對某些查詢可能不可用）
-        try:
-            # 獲取查詢的欄位名稱（僅對簡單SELECT查詢有效）
-            description = self.conn.description if hasattr(self.conn, 'description') else None
-            if description:
-                headers = [col[0] for col in description]
-            else:
-                headers = [f"列{i+1}" for i in range(len(result[0]) if result else 0)]
-        except:
-            headers = [f"列{i+1}" for i in range(len(result[0]) if result else 0)]
-        
-        # 顯示結果
-        print(tabulate(result, headers=headers, tablefmt="grid", maxcolwidths=30))
-        print(f"\n✅ 查詢完成，返回 {len(result)} 筆記錄")
+        # 欄位名稱取自查詢結果，任何查詢（含重複欄名）都可用
+        print(_tabulate(rows, headers=headers, tablefmt="grid", maxcolwidths=30))
+        print(f"\n✅ 查詢完成，返回 {len(rows)} 筆記錄")
     
     def export_data(self, output_file: str, query: str = None, table_name: str = 'specs', 
                    format: str = 'csv'):
@@ -445,86 +567,113 @@ class DuckDBQueryCLI:
         else:
             sql_query = f"SELECT * FROM {table_name}"
         
-        result = self.execute_query(sql_query)
+        fmt = format.lower()
+        if fmt not in COPY_FORMAT_OPTIONS:
+            print(f"❌ 不支援的格式: {format}")
+            return
         
-        if result is None:
-            print("❌ 資料查詢失敗")
+        # 由DuckDB以COPY TO直接寫檔，資料不經過Python
+        try:
+            row_count = self._export_copy(sql_query, output_file, fmt)
+        except duckdb.Error as e:
+            # 例如 SHOW / DESCRIBE 等無法放入子查詢的語句，改由Python逐批寫出
+            print(f"⚠️  COPY TO 無法執行，改用逐批匯出: {e}")
+            row_count = self._export_batches(sql_query, output_file, fmt)
+        
+        if row_count is None:
             return
         
-        if not result:
+        if not row_count:
             print("📭 沒有資料可匯出")
             return
         
+        print(f"✅ 成功匯出 {row_count} 筆記錄到 {output_file}")
+    
+    def _export_copy(self, sql_query: str, output_file: str, fmt: str) -> int:
+        """
+        以 COPY TO 寫到同目錄的暫存檔，有資料才放到輸出路徑（沒有資料時不動既有檔案）
+        
+        Returns:
+            匯出筆數；COPY 無法執行時拋出 duckdb.Error
+        """
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(output_file)), suffix='.tmp')
+        os.close(fd)
         try:
-            if format.lower() == 'csv':
-                # 對於自定義查詢，嘗試從查詢結果推斷欄位名稱
-                if query:
-                    # 簡單的欄位名稱推斷 - 提取SELECT後面的欄位
-                    try:
-                        select_part = query.upper().split('SELECT')[1].split('FROM')[0]
-                        if '*' in select_part:
-                            # 如果是SELECT *，獲取表格的所有欄位
-                            columns_result = self.execute_query(f"DESCRIBE {table_name}")
-                            headers = [col[0] for col in columns_result] if columns_result else []
-                        else:
-                            # 簡單解析欄位名稱（去除AS別名等）
-                            fields = [field.strip().split(' AS ')[-1].split(' ')[-1] for field in select_part.split(',')]
-                            headers = [field.strip() for field in fields]
-                    except:
-                        # 如果解析失敗，使用通用名稱
-                        headers = [f"欄位{i+1}" for i in range(len(result[0]) if result else 0)]
-                else:
-                    # 獲取表格的所有欄位名稱
-                    columns_result = self.execute_query(f"DESCRIBE {table_name}")
-                    headers = [col[0] for col in columns_result] if columns_result else []
-                
-                # 確保headers數量與結果欄位數量匹配
-                if result and len(headers) != len(result[0]):
-                    headers = [f"欄位{i+1}" for i in range(len(result[0]))]
-                
-                # 使用pandas匯出CSV
-                df = pd.DataFrame(result, columns=headers)
-                df.to_csv(output_file, index=False, encoding='utf-8-sig')
-                
-            elif format.lower() == 'json':
-                # 獲取欄位名稱
-                columns_result = self.execute_query(f"DESCRIBE {table_name}")
-                if columns_result:
-                    headers = [col[0] for col in columns_result]
-                else:
-                    headers = [f"欄位{i+1}" for i in range(len(result[0]))]
-                
-                # 轉換為字典列表
-                data = []
-                for row in result:
-                    record = {}
-                    for i, value in enumerate(row):
-                        record[headers[i]] = value
-                    data.append(record)
-                
-                # 匯出JSON
-                with open(output_file, 'w', encoding='utf-8') as f:
-                    json.dump(data, f, ensure_ascii=False, indent=2)
+            target = tmp_path.replace("'", "''")
+            copy_sql = f"COPY ({sql_query.strip().rstrip(';')}) TO '{target}' ({COPY_FORMAT_OPTIONS[fmt]})"
+            row_count = self.execute_query(copy_sql)[0][0]
+            if not row_count:
+                return 0
             
+            if fmt == 'csv':
+                # 與逐批匯出相同，CSV前加上BOM讓Excel正確辨識UTF-8
+                with open(tmp_path, 'rb') as src, open(output_file, 'wb') as dst:
+                    dst.write(codecs.BOM_UTF8)
+                    shutil.copyfileobj(src, dst)
             else:
-                print(f"❌ 不支援的格式: {format}")
-                return
-            
-            print(f"✅ 成功匯出 {len(result)} 筆記錄到 {output_file}")
-            
+                os.replace(tmp_path, output_file)
+            return row_count
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+    
+    def _export_batches(self, sql_query: str, output_file: str, fmt: str) -> Optional[int]:
+        """
+        以Arrow批次逐批寫出查詢結果（COPY TO 的備援路徑）
+        
+        Returns:
+            匯出筆數或None（如果出錯）
+        """
+        try:
+            reader = _to_arrow_reader(self._require_conn().execute(sql_query), EXPORT_BATCH_ROWS)
+        except duckdb.Error as e:
+            print(f"❌ 資料查詢失敗: {e}")
+            print(f"   SQL: {sql_query}")
+            return None
+        
+        # 先取第一批判斷是否有資料，避免產生空檔案
+        first_batch = next(iter(reader), None)
+        if first_batch is None or not first_batch.num_rows:
+            return 0
+        
+        batches = chain([first_batch], reader)
+        row_count = 0
+        
+        try:
+            with open(output_file, 'wb') as f:
+                if fmt == 'csv':
+                    # 保留BOM讓Excel正確辨識UTF-8；欄位名稱直接取自schema
+                    f.write(codecs.BOM_UTF8)
+                    import pyarrow.csv as pa_csv
+                    with pa_csv.CSVWriter(f, reader.schema) as writer:
+                        for batch in batches:
+                            writer.write_batch(batch)
+                            row_count += batch.num_rows
+                else:
+                    # 逐批寫出JSON陣列，每筆記錄一行，不在記憶體中建立完整清單；
+                    # 每批以 to_pylist 一次轉成字典列表，序列化後合併為單次寫入
+                    separator = b"[\n"
+                    for batch in batches:
+                        if not batch.num_rows:
+                            continue
+                        f.write(separator + b",\n".join(map(_json_dumps, batch.to_pylist())))
+                        separator = b",\n"
+                        row_count += batch.num_rows
+                    f.write(b"\n]\n")
         except Exception as e:
             print(f"❌ 匯出失敗: {e}")
+            return None
+        
+        return row_count
     
     def _get_file_size(self, file_path: str) -> str:
         """獲取檔案大小的人類可讀格式"""
         try:
             size_bytes = os.path.getsize(file_path)
             
-            for unit in ['B', 'KB', 'MB', 'GB']:
-                if size_bytes < 1024:
-                    return f"{size_bytes:.1f} {unit}"
-                size_bytes /= 1024
-            return f"{size_bytes:.1f} TB"
+            # 以位元長度直接換算單位級距（每1024進一級）
+            level = min((max(size_bytes, 1).bit_length() - 1) // 10, len(FILE_SIZE_UNITS) - 1)
+            return f"{size_bytes / 1024 ** level:.1f} {FILE_SIZE_UNITS[level]}"
             
         except:
             return "未知"
@@ -555,6 +704,19 @@ def main():
         help='DuckDB資料庫檔案路徑 (預設: db/sales_specs.db)'
     )
     
+    parser.add_argument(
+        '--threads',
+        type=int,
+        default=None,
+        help='DuckDB查詢執行緒數 (預設: CPU核心數)'
+    )
+    
+    parser.add_argument(
+        '--memory-limit',
+        default=None,
+        help="DuckDB記憶體上限，例如 '4GB' (預設: 由DuckDB決定)"
+    )
+    
     parser.add_argument(
         '--table',
         default='specs',
@@ -578,6 +740,7 @@ def main():
     # show命令
     show_parser = subparsers.add_parser('show', help='顯示特定型號詳細資訊')
     show_parser.add_argument('model', help='型號名稱')
+    show_parser.add_argument('--fields', nargs='+', help='指定顯示欄位 (預設: 全部)')
     
     # search命令
     search_parser = subparsers.add_parser('search', help='搜尋記錄')
@@ -600,14 +763,12 @@ def main():
     
     args = parser.parse_args()
     
-    # 檢查依賴
-    try:
-        import duckdb
-        import tabulate
-        import pandas
-    except ImportError as e:
-        print(f"❌ 缺少必要套件: {e}")
-        print("請執行: pip install duckdb tabulate pandas")
+    # 檢查依賴（只確認套件存在，不實際載入）
+    missing = [name for name in ('duckdb', 'tabulate', 'pyarrow')
+               if importlib.util.find_spec(name) is None]
+    if missing:
+        print(f"❌ 缺少必要套件: {', '.join(missing)}")
+        print("請執行: pip install duckdb tabulate pyarrow")
         sys.exit(1)
     
     # 如果沒有指定命令，顯示幫助
@@ -616,7 +777,7 @@ def main():
         sys.exit(1)
     
     # 初始化CLI工具
-    cli = DuckDBQueryCLI(args.db_path)
+    cli = DuckDBQueryCLI(args.db_path, threads=args.threads, memory_limit=args.memory_limit)
     
     if not cli.connect():
         sys.exit(1)
@@ -638,7 +799,7 @@ def main():
             )
             
         elif args.command == 'show':
-            cli.show_model(args.model, args.table)
+            cli.show_model(args.model, args.table, args.fields)
             
         elif args.command == 'search':
             cli.search_records(args.keyword, args.table, args.limit)
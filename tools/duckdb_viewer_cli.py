@@ -1,9 +1,28 @@
 import re
 import argparse
-import pandas as pd
-from tabulate import tabulate
+import importlib.util
 import sys
 
+# Regex to identify model names which act as delimiters for sections.
+# This pattern looks for capitalized words followed by numbers and an optional suffix, ending with a colon.
+# e.g., "AHP819:", "ARB819-S:", "AG958V v1.0"
+MODEL_DELIMITER_PATTERN = re.compile(r'\b([A-Z]{2,4}[0-9]{3,4}(?:[-_][A-Z0-9_]+)?(?:\s+v[0-9.]+)?:)')
+
+# Regex patterns to find key-value pairs. Due to the messy format,
+# we use several patterns to capture as much as possible.
+# Pattern 1: Lines starting with "- Key: Value"
+SPEC_PATTERN_1 = re.compile(r'-\s*([^:]+?)\s*:\s*(.+)')
+# Pattern 2: Lines with "Key Value" structure for things like CPU models
+SPEC_PATTERN_2 = re.compile(r'\b(Ryzen\s*[0-9PRO\s]+[A-Z0-9]+)\s*\((.+)\)')
+# Pattern 3: Simple "Key: Value" on its own line
+SPEC_PATTERN_3 = re.compile(r'^([A-Za-z\s/&]+):\s*(.+)', re.MULTILINE)
+# All three patterns tried in order with one match call. The alternatives are
+# mutually exclusive on the first characters, so priority is unchanged; the
+# (key, value) pair is always the last two groups that participated.
+SPEC_LINE_PATTERN = re.compile('|'.join(
+    f'(?:{pattern.pattern})' for pattern in (SPEC_PATTERN_1, SPEC_PATTERN_2, SPEC_PATTERN_3)
+))
+
 def parse_spec_file(file_path):
     """
     Parses a semi-structured text file containing product specifications.
@@ -26,18 +45,9 @@ def parse_spec_file(file_path):
         print(f"讀取檔案時發生錯誤：{e}")
         sys.exit(1)
 
-    # Regex to identify model names which act as delimiters for sections.
-    # This pattern looks for capitalized words followed by numbers and an optional suffix, ending with a colon.
-    # e.g., "AHP819:", "ARB819-S:", "AG958V v1.0"
-    # We also treat lines with many model names as a potential source of models.
-    model_delimiter_pattern = re.compile(r'\b([A-Z]{2,4}[0-9]{3,4}(?:[-_][A-Z0-9_]+)?(?:\s+v[0-9.]+)?:)')
-    
-    # Pre-scan for all possible model names to ensure we catch them all
-    all_models = set(m.strip(':') for m in model_delimiter_pattern.findall(content))
-
     # Split the content by these delimiters. The result is a list like
     # ['intro text', 'MODEL_A:', 'specs for A', 'MODEL_B:', 'specs for B', ...]
-    parts = model_delimiter_pattern.split(content)
+    parts = MODEL_DELIMITER_PATTERN.split(content)
     
     data = {}
     current_model = None
@@ -50,30 +60,16 @@ def parse_spec_file(file_path):
         if model_name not in data:
             data[model_name] = {}
 
-        # Regex patterns to find key-value pairs. Due to the messy format,
-        # we use several patterns to capture as much as possible.
-        # Pattern 1: Lines starting with "- Key: Value"
-        spec_pattern_1 = re.compile(r'-\s*([^:]+?)\s*:\s*(.+)')
-        # Pattern 2: Lines with "Key Value" structure for things like CPU models
-        spec_pattern_2 = re.compile(r'\b(Ryzen\s*[0-9PRO\s]+[A-Z0-9]+)\s*\((.+)\)')
-        # Pattern 3: Simple "Key: Value" on its own line
-        spec_pattern_3 = re.compile(r'^([A-Za-z\s/&]+):\s*(.+)', re.MULTILINE)
-
         for line in model_content.splitlines():
             line = line.strip()
             if not line:
                 continue
             
-            # Try patterns in order
-            match = spec_pattern_1.match(line)
-            if not match:
-                match = spec_pattern_2.match(line)
-            if not match:
-                 match = spec_pattern_3.match(line)
+            match = SPEC_LINE_PATTERN.match(line)
 
             if match:
-                key = match.group(1).strip()
-                value = match.group(2).strip()
+                key = match.group(match.lastindex - 1).strip()
+                value = match.group(match.lastindex).strip()
                 
                 # Avoid adding nonsensical keys
                 if len(key) > 50 or 'nodata' in key.lower():
@@ -90,11 +86,9 @@ def main():
     """
     Main function to run the CLI.
     """
-    # Note for the user about installing dependencies
-    try:
-        import pandas
-        import tabulate
-    except ImportError:
+    # Note for the user about installing dependencies.
+    # Only check that they exist; they are imported by the commands that use them.
+    if any(importlib.util.find_spec(name) is None for name in ('pandas', 'tabulate')):
         print("請先安裝必要的函式庫：pip install pandas openpyxl tabulate")
         sys.exit(1)
 
@@ -133,6 +127,7 @@ def main():
             print(f"- {model}")
 
     elif args.command == "show":
+        from tabulate import tabulate
         models_to_show = [args.model] if args.model else sorted(data.keys())
         for model in models_to_show:
             if model in data:
@@ -148,6 +143,7 @@ def main():
                 print(f"\n錯誤：找不到型號 '{model}'。")
     
     elif args.command == "export":
+        import pandas as pd
         output_file = args.output
         if args.format == "csv":
             # Flatten data for CSV: Model, Specification, Value
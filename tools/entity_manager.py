@@ -7,20 +7,55 @@ Entity Patterns Manager CLI
 
 import os
 import sys
-import json
 import re
 import argparse
+import io
+import shutil
+from contextlib import redirect_stdout
+from datetime import datetime
+from functools import cached_property, lru_cache
 from pathlib import Path
 from tabulate import tabulate
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Tuple
+
+try:
+    import regex as _match_re  # 第三方 regex 模組，語法相容 re 且比對較快
+except ImportError:
+    _match_re = re
+
+# 測試比對時可能拋出的正則錯誤類型
+_REGEX_ERRORS = (re.error, _match_re.error)
 
 # 添加專案根目錄到路徑
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
+from tools._config_io import atomic_write_bytes, digest, json_dumps, load_config_section
+from tools._manager_cli import build_parser, run_cli
+
 # 設定檔路徑
 ENTITY_PATTERNS_PATH = project_root / "libs/services/sales_assistant/prompts/entity_patterns.json"
 BACKUP_DIR = project_root / "tools/backups"
+# 備份與匯出檔名的時間戳格式
+TIMESTAMP_FORMAT = "%Y%m%d_%H%M%S"
+
+# 編號反向參照（\1）或以編號判斷的條件群組（(?(1)...)），合併成單一正則後會指向其他模式的群組
+_NUMBERED_GROUP_REF = re.compile(r'(?<!\\)(?:\\\\)*(?:\\[1-9]|\(\?\(\d)')
+
+@lru_cache(maxsize=1024)
+def _compile_cached(pattern: str, flags: int = 0, engine=re) -> "re.Pattern":
+    """編譯正則表達式並快取結果，重複驗證或測試同一模式時不再重新編譯"""
+    return engine.compile(pattern, flags)
+
+def _compile_matcher(pattern: str, flags: int = 0) -> "re.Pattern":
+    """
+    編譯測試比對用的正則：先以 re 檢查語法（實體識別服務使用 re），
+    有 regex 模組時再以 regex 編譯比對
+    """
+    compiled = _compile_cached(pattern, flags)
+    if _match_re is re:
+        return compiled
+    return _compile_cached(pattern, flags, _match_re)
 
 class EntityPatternsManager:
     """實體模式管理器"""
@@ -29,14 +64,24 @@ class EntityPatternsManager:
         self.patterns_path = ENTITY_PATTERNS_PATH
         self.backup_dir = BACKUP_DIR
         self.backup_dir.mkdir(exist_ok=True)
-        self.patterns = self._load_patterns()
+        # 磁碟上設定檔內容的雜湊值，儲存內容相同時略過備份與寫入
+        self._last_hash = None
+        # 為 True 時只在第一次存檔前備份一次（互動模式等批次操作）
+        self.backup_once = False
+        self._backed_up = False
+        # 成員查詢用的集合：{(實體類型, 欄位): set}，磁碟格式仍為列表
+        self._member_sets: Dict[Tuple[str, str], set] = {}
+    
+    @cached_property
+    def patterns(self) -> Dict[str, Any]:
+        """設定內容，第一次存取時才載入"""
+        return self._load_patterns()
     
     def _load_patterns(self) -> Dict[str, Any]:
         """載入實體模式設定"""
         try:
-            with open(self.patterns_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                return data.get('entity_patterns', {})
+            section, self._last_hash = load_config_section(self.patterns_path, 'entity_patterns')
+            return section
         except Exception as e:
             print(f"❌ 載入設定檔失敗: {e}")
             return {}
@@ -44,12 +89,16 @@ class EntityPatternsManager:
     def _save_patterns(self, backup: bool = True) -> bool:
         """儲存實體模式設定"""
         try:
-            if backup:
-                self._create_backup()
-            
             data = {"entity_patterns": self.patterns}
-            with open(self.patterns_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            payload = json_dumps(data)
+            payload_digest = digest(payload)
+            if payload_digest == self._last_hash:
+                return True  # 內容與磁碟上相同，不需備份與寫入
+            
+            if backup and not (self.backup_once and self._backed_up):
+                self._create_backup()
+            atomic_write_bytes(self.patterns_path, payload)
+            self._last_hash = payload_digest
             return True
         except Exception as e:
             print(f"❌ 儲存設定檔失敗: {e}")
@@ -57,17 +106,33 @@ class EntityPatternsManager:
     
     def _create_backup(self):
         """建立備份檔案"""
-        from datetime import datetime
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        backup_file = self.backup_dir / f"entity_patterns_{timestamp}.json"
+        timestamp = datetime.now().strftime(TIMESTAMP_FORMAT)
+        backup_file = self.backup_dir / f"entity_patterns__{timestamp}.json"
         
         try:
-            import shutil
-            shutil.copy2(self.patterns_path, backup_file)
+            # 存檔以 os.replace 換上新檔，舊檔內容不會被改寫，備份用硬連結即可
+            try:
+                os.link(self.patterns_path, backup_file)
+            except OSError:
+                shutil.copy2(self.patterns_path, backup_file)
             print(f"📋 已建立備份: {backup_file}")
+            self._backed_up = True
         except Exception as e:
             print(f"⚠️  建立備份失敗: {e}")
     
+    def _members(self, entity_type: str, field: str) -> set:
+        """取得實體類型某欄位（patterns / examples）的成員集合，首次使用時建立"""
+        key = (entity_type, field)
+        members = self._member_sets.get(key)
+        if members is None:
+            members = self._member_sets[key] = set(self.patterns[entity_type].get(field, []))
+        return members
+    
+    def _drop_members(self, entity_type: str, field: str = None):
+        """列表內容被整批替換或刪除時，捨棄對應的成員集合"""
+        for key in [k for k in self._member_sets if k[0] == entity_type and field in (None, k[1])]:
+            del self._member_sets[key]
+    
     def list_entities(self):
         """列出所有實體類型"""
         if not self.patterns:
@@ -89,8 +154,8 @@ class EntityPatternsManager:
             ])
         
         headers = ['實體類型', '描述', '模式數量', '範例數量', '範例預覽']
-        print("\n📋 實體模式列表:")
-        print(tabulate(table_data, headers=headers, tablefmt='grid'))
+        # 標題與表格組成單一字串，一次寫入 stdout
+        sys.stdout.write(f"\n📋 實體模式列表:\n{tabulate(table_data, headers=headers, tablefmt='grid')}\n")
     
     def show_entity(self, entity_type: str):
         """顯示特定實體類型的詳細資訊"""
@@ -124,7 +189,7 @@ class EntityPatternsManager:
         # 驗證正則表達式模式
         for pattern in patterns:
             try:
-                re.compile(pattern)
+                _compile_cached(pattern)
             except re.error as e:
                 print(f"❌ 無效的正則表達式模式 '{pattern}': {e}")
                 return False
@@ -134,6 +199,7 @@ class EntityPatternsManager:
             "description": description,
             "examples": examples or []
         }
+        self._drop_members(entity_type)
         
         if self._save_patterns():
             print(f"✅ 已新增實體類型 '{entity_type}'")
@@ -157,12 +223,13 @@ class EntityPatternsManager:
                 value = [value]
             for pattern in value:
                 try:
-                    re.compile(pattern)
+                    _compile_cached(pattern)
                 except re.error as e:
                     print(f"❌ 無效的正則表達式模式 '{pattern}': {e}")
                     return False
         
         self.patterns[entity_type][field] = value
+        self._drop_members(entity_type, field)
         
         if self._save_patterns():
             print(f"✅ 已更新實體類型 '{entity_type}' 的 {field}")
@@ -176,6 +243,7 @@ class EntityPatternsManager:
             return False
         
         del self.patterns[entity_type]
+        self._drop_members(entity_type)
         
         if self._save_patterns():
             print(f"✅ 已刪除實體類型 '{entity_type}'")
@@ -190,16 +258,18 @@ class EntityPatternsManager:
         
         # 驗證正則表達式
         try:
-            re.compile(pattern)
+            _compile_cached(pattern)
         except re.error as e:
             print(f"❌ 無效的正則表達式模式 '{pattern}': {e}")
             return False
         
-        if pattern in self.patterns[entity_type]['patterns']:
+        members = self._members(entity_type, 'patterns')
+        if pattern in members:
             print(f"❌ 模式 '{pattern}' 已存在")
             return False
         
         self.patterns[entity_type]['patterns'].append(pattern)
+        members.add(pattern)
         
         if self._save_patterns():
             print(f"✅ 已為 '{entity_type}' 新增模式 '{pattern}'")
@@ -212,12 +282,13 @@ class EntityPatternsManager:
             print(f"❌ 實體類型 '{entity_type}' 不存在")
             return False
         
-        patterns = self.patterns[entity_type]['patterns']
-        if pattern not in patterns:
+        if pattern not in self._members(entity_type, 'patterns'):
             print(f"❌ 模式 '{pattern}' 不存在")
             return False
         
-        patterns.remove(pattern)
+        self.patterns[entity_type]['patterns'].remove(pattern)
+        # 列表中可能仍有重複的同一模式，集合於下次使用時重建
+        self._drop_members(entity_type, 'patterns')
         
         if self._save_patterns():
             print(f"✅ 已從 '{entity_type}' 移除模式 '{pattern}'")
@@ -230,12 +301,13 @@ class EntityPatternsManager:
             print(f"❌ 實體類型 '{entity_type}' 不存在")
             return False
         
-        examples = self.patterns[entity_type].setdefault('examples', [])
-        if example in examples:
+        members = self._members(entity_type, 'examples')
+        if example in members:
             print(f"❌ 範例 '{example}' 已存在")
             return False
         
-        examples.append(example)
+        self.patterns[entity_type].setdefault('examples', []).append(example)
+        members.add(example)
         
         if self._save_patterns():
             print(f"✅ 已為 '{entity_type}' 新增範例 '{example}'")
@@ -245,7 +317,7 @@ class EntityPatternsManager:
     def test_pattern(self, pattern: str, test_text: str):
         """測試正則表達式模式"""
         try:
-            regex = re.compile(pattern, re.IGNORECASE)
+            regex = _compile_matcher(pattern, re.IGNORECASE)
             matches = list(regex.finditer(test_text))
             
             print(f"\n🧪 測試模式: {pattern}")
@@ -258,9 +330,99 @@ class EntityPatternsManager:
             if not matches:
                 print("  (無匹配)")
                 
-        except re.error as e:
+        except _REGEX_ERRORS as e:
             print(f"❌ 無效的正則表達式: {e}")
     
+    def _pattern_matchers(self) -> List[Tuple["re.Pattern", List[Tuple[str, str]], bool]]:
+        """
+        依序將模式分段編譯：連續可合併的模式合成一個交替正則（每個模式一個具名群組），
+        含編號反向參照或條件群組的模式單獨編譯，合併後會指向其他模式的群組
+        
+        Returns:
+            [(編譯結果, 群組序號對應的 (實體類型, 模式) 列表, 是否為合併正則)]
+        """
+        matchers = []
+        run = []
+        
+        def flush():
+            if not run:
+                return
+            parts = [f"(?P<_p{i}>{pattern})" for i, (_, pattern) in enumerate(run)]
+            try:
+                matchers.append((_compile_matcher('|'.join(parts), re.IGNORECASE), list(run), True))
+            except _REGEX_ERRORS:
+                # 無法合併（如模式間重複群組名稱或含無效模式），改為逐一編譯
+                for owner in run:
+                    add_single(owner)
+            run.clear()
+        
+        def add_single(owner):
+            try:
+                matchers.append((_compile_matcher(owner[1], re.IGNORECASE), [owner], False))
+            except _REGEX_ERRORS as e:
+                print(f"⚠️  略過無效模式 '{owner[1]}': {e}")
+        
+        for entity_type, config in self.patterns.items():
+            for pattern in config.get('patterns', []):
+                if _NUMBERED_GROUP_REF.search(pattern):
+                    flush()
+                    add_single((entity_type, pattern))
+                else:
+                    run.append((entity_type, pattern))
+        flush()
+        return matchers
+    
+    def match_all(self, test_text: str) -> List[Tuple[Tuple[str, str], "re.Match"]]:
+        """
+        以所有實體模式比對文字，回傳 [((實體類型, 模式), 匹配)]
+        
+        結果等同所有模式依序組成的單一交替正則：由左至右、不重疊，同一位置由排在前面的模式取得
+        """
+        matchers = self._pattern_matchers()
+        
+        def owner_of(index, match):
+            _, owners, fused = matchers[index]
+            # 外層具名群組最後結束，lastgroup 即為匹配到的模式
+            return owners[int(match.lastgroup[2:])] if fused else owners[0]
+        
+        if len(matchers) == 1:
+            return [(owner_of(0, m), m) for m in matchers[0][0].finditer(test_text)]
+        
+        # 多段正則時取各段下一個匹配中最左者（同位置取排前者），再從該匹配結尾繼續
+        matches = []
+        pending = [regex.search(test_text) for regex, _, _ in matchers]
+        while True:
+            candidates = [(m.start(), i) for i, m in enumerate(pending) if m is not None]
+            if not candidates:
+                break
+            _, index = min(candidates)
+            match = pending[index]
+            matches.append((owner_of(index, match), match))
+            # 空字串匹配時前進一個字元，避免重複同一位置
+            pos = match.end() if match.end() > match.start() else match.end() + 1
+            for i, m in enumerate(pending):
+                if m is not None and m.start() < pos:
+                    pending[i] = matchers[i][0].search(test_text, pos) if pos <= len(test_text) else None
+        return matches
+    
+    def test_all(self, test_text: str):
+        """以所有實體模式測試文字，可合併的模式合成單一正則只掃描文字一次"""
+        print(f"\n🧪 測試所有實體模式")
+        print(f"📝 測試文本: {test_text}")
+        
+        if not any(config.get('patterns') for config in self.patterns.values()):
+            print("❌ 沒有找到任何實體模式")
+            return
+        
+        matches = self.match_all(test_text)
+        
+        print(f"🎯 找到 {len(matches)} 個匹配:")
+        for i, ((entity_type, pattern), match) in enumerate(matches, 1):
+            print(f"  {i}. '{match.group()}' (位置: {match.start()}-{match.end()}) → {entity_type}: {pattern}")
+        
+        if not matches:
+            print("  (無匹配)")
+    
     def validate_config(self):
         """驗證設定檔的有效性"""
         print("🔍 驗證實體模式設定...")
@@ -270,17 +432,23 @@ class EntityPatternsManager:
         
         for entity_type, config in self.patterns.items():
             # 檢查必要欄位
-            if 'patterns' not in config:
+            patterns = config.get('patterns')
+            if patterns is None:
                 errors.append(f"實體類型 '{entity_type}' 缺少 'patterns' 欄位")
                 continue
             
-            if not config['patterns']:
+            if not patterns:
                 warnings.append(f"實體類型 '{entity_type}' 沒有定義任何模式")
             
-            # 驗證正則表達式
-            for pattern in config['patterns']:
+            # 單次走訪：同時檢查重複模式並驗證正則表達式，重複的模式不再編譯
+            seen = set()
+            for pattern in patterns:
+                if pattern in seen:
+                    warnings.append(f"實體類型 '{entity_type}' 有重複模式: '{pattern}'")
+                    continue
+                seen.add(pattern)
                 try:
-                    re.compile(pattern)
+                    _compile_cached(pattern)
                 except re.error as e:
                     errors.append(f"實體類型 '{entity_type}' 的模式 '{pattern}' 無效: {e}")
         
@@ -300,9 +468,15 @@ class EntityPatternsManager:
         
         return len(errors) == 0
 
-def main():
-    parser = argparse.ArgumentParser(description='實體模式管理工具')
-    subparsers = parser.add_subparsers(dest='command', help='可用命令')
+def validate() -> Tuple[bool, str]:
+    """驗證設定檔，回傳 (是否通過, 驗證輸出)，供其他工具在同一程序內呼叫"""
+    buf = io.StringIO()
+    with redirect_stdout(buf):
+        valid = EntityPatternsManager().validate_config()
+    return valid, buf.getvalue()
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser, subparsers = build_parser('實體模式管理工具')
     
     # list 命令
     subparsers.add_parser('list', help='列出所有實體類型')
@@ -348,17 +522,17 @@ def main():
     test_parser.add_argument('pattern', help='正則表達式模式')
     test_parser.add_argument('text', help='測試文字')
     
+    # test-all 命令
+    test_all_parser = subparsers.add_parser('test-all', help='以所有實體模式測試文字')
+    test_all_parser.add_argument('text', help='測試文字')
+    
     # validate 命令
     subparsers.add_parser('validate', help='驗證設定檔')
     
-    args = parser.parse_args()
-    
-    if not args.command:
-        parser.print_help()
-        return
-    
-    manager = EntityPatternsManager()
-    
+    return parser
+
+def _dispatch(manager: EntityPatternsManager, args: argparse.Namespace) -> bool:
+    """執行單一命令，回傳是否成功（目前僅 validate 會回傳 False）"""
     if args.command == 'list':
         manager.list_entities()
     
@@ -387,8 +561,16 @@ def main():
     elif args.command == 'test':
         manager.test_pattern(args.pattern, args.text)
     
+    elif args.command == 'test-all':
+        manager.test_all(args.text)
+    
     elif args.command == 'validate':
-        manager.validate_config()
+        return manager.validate_config()
+    
+    return True
+
+def main():
+    run_cli(_build_parser(), EntityPatternsManager, _dispatch, 'entities> ')
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
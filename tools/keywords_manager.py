@@ -7,19 +7,36 @@ Query Keywords Manager CLI
 
 import os
 import sys
-import json
 import argparse
+import io
+import shutil
+from contextlib import redirect_stdout
+from itertools import combinations
+from datetime import datetime
+from functools import cached_property
 from pathlib import Path
 from tabulate import tabulate
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Tuple
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
 
 # 添加專案根目錄到路徑
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
+from tools._config_io import atomic_write_bytes, digest, json_dumps, load_config_section
+from tools._manager_cli import build_parser, run_cli
+
 # 設定檔路徑
 QUERY_KEYWORDS_PATH = project_root / "libs/services/sales_assistant/prompts/query_keywords.json"
 BACKUP_DIR = project_root / "tools/backups"
+# 備份與匯出檔名的時間戳格式
+TIMESTAMP_FORMAT = "%Y%m%d_%H%M%S"
+# 串接小寫關鍵字用的分隔字元（Unit Separator），一般關鍵字不會包含
+KEYWORD_SEPARATOR = '\x1f'
 
 class QueryKeywordsManager:
     """查詢關鍵字管理器"""
@@ -28,14 +45,30 @@ class QueryKeywordsManager:
         self.keywords_path = QUERY_KEYWORDS_PATH
         self.backup_dir = BACKUP_DIR
         self.backup_dir.mkdir(exist_ok=True)
-        self.keywords = self._load_keywords()
+        # 磁碟上設定檔內容的雜湊值，儲存內容相同時略過備份與寫入
+        self._last_hash = None
+        # 為 True 時只在第一次存檔前備份一次（互動模式等批次操作）
+        self.backup_once = False
+        self._backed_up = False
+        # 成員查詢用的關鍵字集合：{意圖名稱: set}，磁碟格式仍為列表
+        self._keyword_sets: Dict[str, set] = {}
+        # 小寫關鍵字索引：{意圖名稱: list}，與原關鍵字列表一一對應
+        self._keywords_lower: Dict[str, List[str]] = {}
+        # 小寫關鍵字以分隔字元串接的字串：{意圖名稱: str}，search_keyword 先整串比對
+        self._keywords_joined: Dict[str, str] = {}
+        # test_query 用的 Aho-Corasick 自動機，關鍵字異動時重建
+        self._automaton = None
+    
+    @cached_property
+    def keywords(self) -> Dict[str, Any]:
+        """設定內容，第一次存取時才載入"""
+        return self._load_keywords()
     
     def _load_keywords(self) -> Dict[str, Any]:
         """載入查詢關鍵字設定"""
         try:
-            with open(self.keywords_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                return data.get('intent_keywords', {})
+            section, self._last_hash = load_config_section(self.keywords_path, 'intent_keywords')
+            return section
         except Exception as e:
             print(f"❌ 載入設定檔失敗: {e}")
             return {}
@@ -43,12 +76,16 @@ class QueryKeywordsManager:
     def _save_keywords(self, backup: bool = True) -> bool:
         """儲存查詢關鍵字設定"""
         try:
-            if backup:
-                self._create_backup()
-            
             data = {"intent_keywords": self.keywords}
-            with open(self.keywords_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            payload = json_dumps(data)
+            payload_digest = digest(payload)
+            if payload_digest == self._last_hash:
+                return True  # 內容與磁碟上相同，不需備份與寫入
+            
+            if backup and not (self.backup_once and self._backed_up):
+                self._create_backup()
+            atomic_write_bytes(self.keywords_path, payload)
+            self._last_hash = payload_digest
             return True
         except Exception as e:
             print(f"❌ 儲存設定檔失敗: {e}")
@@ -56,17 +93,106 @@ class QueryKeywordsManager:
     
     def _create_backup(self):
         """建立備份檔案"""
-        from datetime import datetime
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        backup_file = self.backup_dir / f"query_keywords_{timestamp}.json"
+        timestamp = datetime.now().strftime(TIMESTAMP_FORMAT)
+        backup_file = self.backup_dir / f"query_keywords__{timestamp}.json"
         
         try:
-            import shutil
-            shutil.copy2(self.keywords_path, backup_file)
+            # 存檔以 os.replace 換上新檔，舊檔內容不會被改寫，備份用硬連結即可
+            try:
+                os.link(self.keywords_path, backup_file)
+            except OSError:
+                shutil.copy2(self.keywords_path, backup_file)
             print(f"📋 已建立備份: {backup_file}")
+            self._backed_up = True
         except Exception as e:
             print(f"⚠️  建立備份失敗: {e}")
     
+    def _keyword_set(self, intent_name: str) -> set:
+        """取得意圖的關鍵字集合，首次使用時建立"""
+        members = self._keyword_sets.get(intent_name)
+        if members is None:
+            members = self._keyword_sets[intent_name] = set(self.keywords[intent_name].get('keywords', []))
+        return members
+    
+    def _lower_keywords(self, intent_name: str) -> List[str]:
+        """取得意圖的小寫關鍵字列表，首次使用時建立"""
+        lowered = self._keywords_lower.get(intent_name)
+        if lowered is None:
+            lowered = self._keywords_lower[intent_name] = [
+                kw.lower() for kw in self.keywords[intent_name].get('keywords', [])
+            ]
+        return lowered
+    
+    def _joined_keywords(self, intent_name: str) -> str:
+        """取得意圖的小寫關鍵字串接字串，首次使用時建立"""
+        joined = self._keywords_joined.get(intent_name)
+        if joined is None:
+            joined = self._keywords_joined[intent_name] = KEYWORD_SEPARATOR.join(self._lower_keywords(intent_name))
+        return joined
+    
+    def _keywords_changed(self, intent_name: str):
+        """意圖的關鍵字異動後，捨棄由關鍵字衍生的快取"""
+        self._keyword_sets.pop(intent_name, None)
+        self._keywords_lower.pop(intent_name, None)
+        self._keywords_joined.pop(intent_name, None)
+        self._automaton = None
+    
+    def _keyword_automaton(self):
+        """取得所有關鍵字（小寫）的 Aho-Corasick 自動機，值為 [(意圖名稱, 關鍵字索引)]
+
+        回傳 (automaton, always)：空字串關鍵字無法加入自動機，但必定匹配，另列於 always；
+        沒有任何非空關鍵字時 automaton 為 None
+        """
+        if self._automaton is None:
+            automaton = ahocorasick.Automaton()
+            always = []
+            for intent_name in self.keywords:
+                for idx, word in enumerate(self._lower_keywords(intent_name)):
+                    if not word:
+                        always.append((intent_name, idx))
+                        continue
+                    # 不同意圖可能有相同的小寫關鍵字，共用同一個值列表
+                    owners = automaton.get(word, None)
+                    if owners is None:
+                        automaton.add_word(word, [(intent_name, idx)])
+                    else:
+                        owners.append((intent_name, idx))
+            if len(automaton):
+                automaton.make_automaton()
+            else:
+                automaton = None
+            self._automaton = (automaton, always)
+        return self._automaton
+    
+    def _match_keywords(self, query_lower: str) -> Dict[str, List[str]]:
+        """找出查詢文字中出現的關鍵字：{意圖名稱: 依原順序排列的匹配關鍵字}"""
+        if ahocorasick is None:
+            matches = {}
+            for intent_name, config in self.keywords.items():
+                matched_keywords = [keyword for keyword, kw_lower
+                                    in zip(config.get('keywords', []), self._lower_keywords(intent_name))
+                                    if kw_lower in query_lower]
+                if matched_keywords:
+                    matches[intent_name] = matched_keywords
+            return matches
+        
+        # 單次掃描查詢文字取得所有命中，依意圖收集關鍵字索引
+        automaton, always = self._keyword_automaton()
+        hits: Dict[str, set] = {}
+        for intent_name, idx in always:
+            hits.setdefault(intent_name, set()).add(idx)
+        if automaton is not None:
+            for _, owners in automaton.iter(query_lower):
+                for intent_name, idx in owners:
+                    hits.setdefault(intent_name, set()).add(idx)
+        
+        matches = {}
+        for intent_name, config in self.keywords.items():
+            if intent_name in hits:
+                keywords = config['keywords']
+                matches[intent_name] = [keywords[idx] for idx in sorted(hits[intent_name])]
+        return matches
+    
     def list_intents(self):
         """列出所有意圖類型"""
         if not self.keywords:
@@ -86,8 +212,8 @@ class QueryKeywordsManager:
             ])
         
         headers = ['意圖名稱', '描述', '關鍵字數量', '關鍵字預覽']
-        print("\n📋 查詢意圖列表:")
-        print(tabulate(table_data, headers=headers, tablefmt='grid'))
+        # 標題與表格組成單一字串，一次寫入 stdout
+        sys.stdout.write(f"\n📋 查詢意圖列表:\n{tabulate(table_data, headers=headers, tablefmt='grid')}\n")
     
     def show_intent(self, intent_name: str):
         """顯示特定意圖的詳細資訊"""
@@ -116,6 +242,7 @@ class QueryKeywordsManager:
             "keywords": keywords,
             "description": description
         }
+        self._keywords_changed(intent_name)
         
         if self._save_keywords():
             print(f"✅ 已新增意圖 '{intent_name}'")
@@ -138,6 +265,8 @@ class QueryKeywordsManager:
             value = [value]
         
         self.keywords[intent_name][field] = value
+        if field == 'keywords':
+            self._keywords_changed(intent_name)
         
         if self._save_keywords():
             print(f"✅ 已更新意圖 '{intent_name}' 的 {field}")
@@ -151,6 +280,7 @@ class QueryKeywordsManager:
             return False
         
         del self.keywords[intent_name]
+        self._keywords_changed(intent_name)
         
         if self._save_keywords():
             print(f"✅ 已刪除意圖 '{intent_name}'")
@@ -163,12 +293,17 @@ class QueryKeywordsManager:
             print(f"❌ 意圖 '{intent_name}' 不存在")
             return False
         
-        keywords = self.keywords[intent_name]['keywords']
-        if keyword in keywords:
+        members = self._keyword_set(intent_name)
+        if keyword in members:
             print(f"❌ 關鍵字 '{keyword}' 已存在")
             return False
         
-        keywords.append(keyword)
+        self.keywords[intent_name]['keywords'].append(keyword)
+        members.add(keyword)
+        if intent_name in self._keywords_lower:
+            self._keywords_lower[intent_name].append(keyword.lower())
+        self._keywords_joined.pop(intent_name, None)
+        self._automaton = None
         
         if self._save_keywords():
             print(f"✅ 已為 '{intent_name}' 新增關鍵字 '{keyword}'")
@@ -181,12 +316,13 @@ class QueryKeywordsManager:
             print(f"❌ 意圖 '{intent_name}' 不存在")
             return False
         
-        keywords = self.keywords[intent_name]['keywords']
-        if keyword not in keywords:
+        if keyword not in self._keyword_set(intent_name):
             print(f"❌ 關鍵字 '{keyword}' 不存在")
             return False
         
-        keywords.remove(keyword)
+        self.keywords[intent_name]['keywords'].remove(keyword)
+        # 列表中可能仍有重複的同一關鍵字，集合於下次使用時重建
+        self._keywords_changed(intent_name)
         
         if self._save_keywords():
             print(f"✅ 已從 '{intent_name}' 移除關鍵字 '{keyword}'")
@@ -199,9 +335,12 @@ class QueryKeywordsManager:
         keyword_lower = keyword.lower()
         
         for intent_name, config in self.keywords.items():
+            # 整串比對一次即可略過沒有任何關鍵字命中的意圖；命中時才逐一確認
+            if keyword_lower not in self._joined_keywords(intent_name):
+                continue
             keywords = config.get('keywords', [])
-            for kw in keywords:
-                if keyword_lower in kw.lower():
+            for kw, kw_lower in zip(keywords, self._lower_keywords(intent_name)):
+                if keyword_lower in kw_lower:
                     matches.append((intent_name, kw))
         
         if matches:
@@ -221,17 +360,10 @@ class QueryKeywordsManager:
         query_lower = query.lower()
         matches = []
         
-        for intent_name, config in self.keywords.items():
-            keywords = config.get('keywords', [])
-            matched_keywords = []
-            
-            for keyword in keywords:
-                if keyword.lower() in query_lower:
-                    matched_keywords.append(keyword)
-            
-            if matched_keywords:
-                confidence = len(matched_keywords) / len(keywords)
-                matches.append((intent_name, matched_keywords, confidence))
+        for intent_name, matched_keywords in self._match_keywords(query_lower).items():
+            keywords = self.keywords[intent_name]['keywords']
+            confidence = len(matched_keywords) / len(keywords)
+            matches.append((intent_name, matched_keywords, confidence))
         
         if matches:
             # 按信心度排序
@@ -265,8 +397,7 @@ class QueryKeywordsManager:
         else:
             data = self.keywords
         
-        from datetime import datetime
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        timestamp = datetime.now().strftime(TIMESTAMP_FORMAT)
         
         if format == 'txt':
             filename = f"keywords_export_{timestamp}.txt"
@@ -278,8 +409,8 @@ class QueryKeywordsManager:
                     f.write("\n")
         elif format == 'json':
             filename = f"keywords_export_{timestamp}.json"
-            with open(filename, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            with open(filename, 'wb') as f:
+                f.write(json_dumps(data))
         
         print(f"✅ 已匯出到 {filename}")
     
@@ -290,29 +421,35 @@ class QueryKeywordsManager:
         errors = []
         warnings = []
         
+        # 各意圖的關鍵字集合，供跨意圖重複檢查
+        intent_sets = {}
+        
         for intent_name, config in self.keywords.items():
             # 檢查必要欄位
-            if 'keywords' not in config:
+            keywords = config.get('keywords')
+            if keywords is None:
                 errors.append(f"意圖 '{intent_name}' 缺少 'keywords' 欄位")
                 continue
             
-            if not config['keywords']:
+            if not keywords:
                 warnings.append(f"意圖 '{intent_name}' 沒有定義任何關鍵字")
             
-            # 檢查重複關鍵字
-            keywords = config['keywords']
-            if len(keywords) != len(set(keywords)):
-                duplicates = [kw for kw in keywords if keywords.count(kw) > 1]
-                warnings.append(f"意圖 '{intent_name}' 有重複關鍵字: {set(duplicates)}")
-        
-        # 檢查跨意圖的重複關鍵字
-        all_keywords = {}
-        for intent_name, config in self.keywords.items():
-            for keyword in config.get('keywords', []):
-                if keyword in all_keywords:
-                    warnings.append(f"關鍵字 '{keyword}' 同時出現在 '{all_keywords[keyword]}' 和 '{intent_name}'")
+            # 單次走訪檢查意圖內的重複關鍵字，同時建立集合
+            seen = intent_sets[intent_name] = set()
+            duplicates = set()
+            for keyword in keywords:
+                if keyword in seen:
+                    duplicates.add(keyword)
                 else:
-                    all_keywords[keyword] = intent_name
+                    seen.add(keyword)
+            if duplicates:
+                warnings.append(f"意圖 '{intent_name}' 有重複關鍵字: {duplicates}")
+        
+        # 跨意圖的重複關鍵字：兩兩取交集，交集非空時每對意圖只產生一則警告
+        for (name1, set1), (name2, set2) in combinations(intent_sets.items(), 2):
+            common = set1 & set2
+            if common:
+                warnings.append(f"關鍵字 {sorted(common)} 同時出現在 '{name1}' 和 '{name2}'")
         
         # 顯示結果
         if errors:
@@ -330,9 +467,15 @@ class QueryKeywordsManager:
         
         return len(errors) == 0
 
-def main():
-    parser = argparse.ArgumentParser(description='查詢關鍵字管理工具')
-    subparsers = parser.add_subparsers(dest='command', help='可用命令')
+def validate() -> Tuple[bool, str]:
+    """驗證設定檔，回傳 (是否通過, 驗證輸出)，供其他工具在同一程序內呼叫"""
+    buf = io.StringIO()
+    with redirect_stdout(buf):
+        valid = QueryKeywordsManager().validate_config()
+    return valid, buf.getvalue()
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser, subparsers = build_parser('查詢關鍵字管理工具')
     
     # list 命令
     subparsers.add_parser('list', help='列出所有意圖')
@@ -383,14 +526,10 @@ def main():
     # validate 命令
     subparsers.add_parser('validate', help='驗證設定檔')
     
-    args = parser.parse_args()
-    
-    if not args.command:
-        parser.print_help()
-        return
-    
-    manager = QueryKeywordsManager()
-    
+    return parser
+
+def _dispatch(manager: QueryKeywordsManager, args: argparse.Namespace) -> bool:
+    """執行單一命令，回傳是否成功（目前僅 validate 會回傳 False）"""
     if args.command == 'list':
         manager.list_intents()
     
@@ -423,7 +562,12 @@ def main():
         manager.export_keywords(args.intent, args.format)
     
     elif args.command == 'validate':
-        manager.validate_config()
+        return manager.validate_config()
+    
+    return True
+
+def main():
+    run_cli(_build_parser(), QueryKeywordsManager, _dispatch, 'keywords> ')
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
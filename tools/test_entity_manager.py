@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+測試 entity_manager 的 test-all 多模式比對
+驗證合併正則與逐一編譯的模式（含編號反向參照）結果一致
+
+用法: python tools/test_entity_manager.py
+"""
+
+import re
+import sys
+from pathlib import Path
+
+# 添加專案根目錄到路徑
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from tools.entity_manager import EntityPatternsManager
+
+def _manager(*patterns: str) -> EntityPatternsManager:
+    """建立只含指定模式的管理器（不讀取設定檔），每個模式一個實體類型"""
+    manager = EntityPatternsManager()
+    manager.patterns = {f"E{i}": {"patterns": [pattern]} for i, pattern in enumerate(patterns)}
+    return manager
+
+def _spans(manager: EntityPatternsManager, text: str):
+    """回傳 [(模式, 匹配文字, 起點)]"""
+    return [(pattern, m.group(), m.start()) for (_, pattern), m in manager.match_all(text)]
+
+def test_backreference_matches_like_test_command():
+    """含 \\1 的模式在 test-all 與單一模式 test 找到相同匹配"""
+    print("🔍 測試編號反向參照...")
+    manager = _manager(r"x+", r"(c)\1")
+    assert _spans(manager, "cc") == [(r"(c)\1", "cc", 0)]
+    assert len(re.findall(r"(c)\1", "cc", re.IGNORECASE)) == 1
+
+    manager = _manager(r"b+", r"(a)\1", r"ab")
+    assert _spans(manager, "aab bb ab") == [
+        (r"(a)\1", "aa", 0),
+        (r"b+", "b", 2),
+        (r"b+", "bb", 4),
+        (r"ab", "ab", 7),
+    ]
+
+    manager = _manager(r"(?:(<))?x(?(1)>)", r"y")
+    assert _spans(manager, "<x> y") == [(r"(?:(<))?x(?(1)>)", "<x>", 0), ("y", "y", 4)]
+    print("  ✅ 通過")
+
+def test_split_scan_matches_single_alternation():
+    """分段比對與所有模式組成的單一交替正則結果相同：由左至右、不重疊、同位置取排前者"""
+    print("🔍 測試分段比對語意...")
+    patterns = [r"ab", r"a", r"(q)\1", r"b\w*", r"\d+"]
+    text = "abc a qq bq 12 ab3"
+    # 不含反向參照時的參考結果：手動重新編號後的單一交替正則
+    reference = re.compile(r"(?P<p0>ab)|(?P<p1>a)|(?P<p2>(q)\4)|(?P<p3>b\w*)|(?P<p4>\d+)", re.IGNORECASE)
+    expected = [(patterns[int(m.lastgroup[1:])], m.group(), m.start()) for m in reference.finditer(text)]
+    assert _spans(_manager(*patterns), text) == expected
+    print("  ✅ 通過")
+
+def test_literal_backslash_digit_is_fused():
+    """跳脫的反斜線加數字（\\\\1）不是反向參照，仍可合併"""
+    print("🔍 測試跳脫反斜線...")
+    manager = _manager(r"a\\1", r"b")
+    matchers = manager._pattern_matchers()
+    assert len(matchers) == 1 and matchers[0][2]
+    assert _spans(manager, r"a\1 b") == [(r"a\\1", "a\\1", 0), ("b", "b", 4)]
+    print("  ✅ 通過")
+
+def main():
+    """主測試函數"""
+    tests = [
+        test_backreference_matches_like_test_command,
+        test_split_scan_matches_single_alternation,
+        test_literal_backslash_digit_is_fused,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            failed += 1
+            print(f"  ❌ 失敗: {test.__name__} {e}")
+
+    print(f"\n🎯 總體結果: {len(tests) - failed}/{len(tests)} 項測試通過")
+    return failed == 0
+
+if __name__ == '__main__':
+    success = main()
+    sys.exit(0 if success else 1)
@@ -3,10 +3,15 @@
 """
 測試所有系列查詢功能
 驗證960、928、AC01系列查詢是否正常工作
+
+用法: python tools/test_series_queries.py [--fail-fast]
 """
 
+import re
 import sys
 import json
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 
 # 添加專案根目錄到路徑
@@ -15,13 +20,29 @@ sys.path.insert(0, str(project_root))
 
 from libs.services.sales_assistant.service import SalesAssistantService
 
+# 系列識別正則，模組載入時編譯一次
+_SERIES_RE = re.compile(r'(?:8(?:19|39)|9(?:28|58|60)|AC01)(?=系列|型號|筆電|notebook|$|\s|[^\d])')
+
+@lru_cache(maxsize=1)
+def _get_service() -> SalesAssistantService:
+    """各測試共用同一個服務實例，只初始化一次（初始化失敗不會被快取）"""
+    return SalesAssistantService()
+
+def _run_parallel(func, items):
+    """以執行緒池平行執行 func(item)，依輸入順序回傳 (item, 結果, 例外) 列表"""
+    def call(item):
+        try:
+            return item, func(item), None
+        except Exception as e:
+            return item, None, e
+    
+    with ThreadPoolExecutor(max_workers=max(len(items), 1)) as executor:
+        return list(executor.map(call, items))
+
 def test_entity_recognition():
     """測試實體識別功能"""
     print("🔍 測試實體識別功能...")
     
-    import re
-    pattern = r'(?:819|839|928|958|960|AC01)(?=系列|型號|筆電|notebook|$|\s|[^\d])'
-    
     test_cases = [
         ("請比較960系列的筆電", ["960"]),
         ("請比較928系列的筆電", ["928"]),
@@ -33,7 +54,7 @@ def test_entity_recognition():
     
     all_passed = True
     for query, expected in test_cases:
-        matches = [m.group() for m in re.finditer(pattern, query)]
+        matches = _SERIES_RE.findall(query)
         if matches == expected:
             print(f"  ✅ \"{query}\" -> {matches}")
         else:
@@ -47,21 +68,20 @@ def test_get_models_by_type():
     print("\n🔧 測試_get_models_by_type函數...")
     
     try:
-        service = SalesAssistantService()
+        service = _get_service()
         
         test_series = ["960", "928", "AC01", "819", "958"]
         all_passed = True
         
-        for series in test_series:
-            try:
-                models = service._get_models_by_type(series)
-                if models:
-                    print(f"  ✅ {series}系列: {models}")
-                else:
-                    print(f"  ❌ {series}系列: 未找到模型")
-                    all_passed = False
-            except Exception as e:
-                print(f"  ❌ {series}系列: 查詢失敗 - {e}")
+        # 各系列的查詢彼此獨立，平行執行後依序輸出
+        for series, models, error in _run_parallel(service._get_models_by_type, test_series):
+            if error:
+                print(f"  ❌ {series}系列: 查詢失敗 - {error}")
+                all_passed = False
+            elif models:
+                print(f"  ✅ {series}系列: {models}")
+            else:
+                print(f"  ❌ {series}系列: 未找到模型")
                 all_passed = False
         
         return all_passed
@@ -75,7 +95,7 @@ def test_parse_query_intent():
     print("\n🧠 測試查詢意圖解析...")
     
     try:
-        service = SalesAssistantService()
+        service = _get_service()
         
         test_queries = [
             "請比較960系列的筆電",
@@ -86,30 +106,29 @@ def test_parse_query_intent():
         
         all_passed = True
         
-        for query in test_queries:
-            try:
-                intent = service._parse_query_intent(query)
-                query_type = intent.get("query_type", "unknown")
-                modeltypes = intent.get("modeltypes", [])
-                
-                if "656" in query:
-                    # 656系列應該被識別但在後續步驟中處理
-                    if query_type in ["model_type", "unknown"]:
-                        print(f"  ✅ \"{query}\" -> {query_type}, modeltypes: {modeltypes}")
-                    else:
-                        print(f"  ❌ \"{query}\" -> {query_type} (期望: model_type或unknown)")
-                        all_passed = False
-                else:
-                    # 存在的系列應該被正確識別
-                    if query_type == "model_type" and modeltypes:
-                        print(f"  ✅ \"{query}\" -> {query_type}, modeltypes: {modeltypes}")
-                    else:
-                        print(f"  ❌ \"{query}\" -> {query_type}, modeltypes: {modeltypes}")
-                        all_passed = False
-                        
-            except Exception as e:
-                print(f"  ❌ \"{query}\" -> 解析失敗: {e}")
+        for query, intent, error in _run_parallel(service._parse_query_intent, test_queries):
+            if error:
+                print(f"  ❌ \"{query}\" -> 解析失敗: {error}")
                 all_passed = False
+                continue
+            
+            query_type = intent.get("query_type", "unknown")
+            modeltypes = intent.get("modeltypes", [])
+            
+            if "656" in query:
+                # 656系列應該被識別但在後續步驟中處理
+                if query_type in ["model_type", "unknown"]:
+                    print(f"  ✅ \"{query}\" -> {query_type}, modeltypes: {modeltypes}")
+                else:
+                    print(f"  ❌ \"{query}\" -> {query_type} (期望: model_type或unknown)")
+                    all_passed = False
+            else:
+                # 存在的系列應該被正確識別
+                if query_type == "model_type" and modeltypes:
+                    print(f"  ✅ \"{query}\" -> {query_type}, modeltypes: {modeltypes}")
+                else:
+                    print(f"  ❌ \"{query}\" -> {query_type}, modeltypes: {modeltypes}")
+                    all_passed = False
         
         return all_passed
         
@@ -122,7 +141,7 @@ def test_get_data_by_query_type():
     print("\n📊 測試資料獲取功能...")
     
     try:
-        service = SalesAssistantService()
+        service = _get_service()
         
         test_cases = [
             {"query_type": "model_type", "modeltypes": ["960"], "modelnames": []},
@@ -132,20 +151,18 @@ def test_get_data_by_query_type():
         
         all_passed = True
         
-        for test_case in test_cases:
-            try:
-                context_data, target_models = service._get_data_by_query_type(test_case)
-                series = test_case["modeltypes"][0]
-                
-                if context_data and target_models:
-                    print(f"  ✅ {series}系列: 找到 {len(context_data)} 筆資料, 模型: {target_models}")
-                else:
-                    print(f"  ❌ {series}系列: 未找到資料")
-                    all_passed = False
-                    
-            except Exception as e:
-                series = test_case["modeltypes"][0]
-                print(f"  ❌ {series}系列: 資料獲取失敗 - {e}")
+        for test_case, result, error in _run_parallel(service._get_data_by_query_type, test_cases):
+            series = test_case["modeltypes"][0]
+            if error:
+                print(f"  ❌ {series}系列: 資料獲取失敗 - {error}")
+                all_passed = False
+                continue
+            
+            context_data, target_models = result
+            if context_data and target_models:
+                print(f"  ✅ {series}系列: 找到 {len(context_data)} 筆資料, 模型: {target_models}")
+            else:
+                print(f"  ❌ {series}系列: 未找到資料")
                 all_passed = False
         
         return all_passed
@@ -159,7 +176,7 @@ def test_error_handling():
     print("\n⚠️  測試錯誤處理...")
     
     try:
-        service = SalesAssistantService()
+        service = _get_service()
         
         # 測試不存在的系列
         try:
@@ -185,22 +202,23 @@ def main():
     print("🧪 系列查詢功能完整測試")
     print("=" * 60)
     
-    test_results = []
-    
-    # 1. 測試實體識別
-    test_results.append(("實體識別", test_entity_recognition()))
-    
-    # 2. 測試模型查詢  
-    test_results.append(("模型查詢", test_get_models_by_type()))
+    # --fail-fast：任一項測試失敗即停止，其餘測試標示為略過
+    fail_fast = "--fail-fast" in sys.argv[1:]
     
-    # 3. 測試意圖解析
-    test_results.append(("意圖解析", test_parse_query_intent()))
-    
-    # 4. 測試資料獲取
-    test_results.append(("資料獲取", test_get_data_by_query_type()))
+    tests = [
+        ("實體識別", test_entity_recognition),      # 1. 測試實體識別
+        ("模型查詢", test_get_models_by_type),      # 2. 測試模型查詢
+        ("意圖解析", test_parse_query_intent),      # 3. 測試意圖解析
+        ("資料獲取", test_get_data_by_query_type),  # 4. 測試資料獲取
+        ("錯誤處理", test_error_handling),          # 5. 測試錯誤處理
+    ]
     
-    # 5. 測試錯誤處理
-    test_results.append(("錯誤處理", test_error_handling()))
+    test_results = []
+    for test_name, test_func in tests:
+        passed = test_func()
+        test_results.append((test_name, passed))
+        if fail_fast and not passed:
+            break
     
     # 總結報告
     print("\n" + "=" * 60)
@@ -212,10 +230,12 @@ def main():
         print(f"  {test_name}: {status}")
         if passed:
             passed_count += 1
+    for test_name, _ in tests[len(test_results):]:
+        print(f"  {test_name}: ⏭️  略過")
     
-    print(f"\n🎯 總體結果: {passed_count}/{len(test_results)} 項測試通過")
+    print(f"\n🎯 總體結果: {passed_count}/{len(tests)} 項測試通過")
     
-    if passed_count == len(test_results):
+    if passed_count == len(tests):
         print("🎉 所有測試通過！960、928、AC01系列查詢功能正常")
         return True
     else:
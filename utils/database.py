@@ -1,17 +1,52 @@
+import os
 import sqlite3
-import duckdb
+import threading
 from pathlib import Path
 import logging
-from typing import Dict, Any, List, Optional
+from typing import TYPE_CHECKING, Dict, Any, Iterable, List, Optional, Tuple
 from contextlib import contextmanager
 
+# duckdb (and pyarrow, which DuckDB loads for Arrow fetches) are imported on first use,
+# so HistoryDatabase-only callers never load them
+if TYPE_CHECKING:
+    import pyarrow
+
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def _to_arrow(result) -> "pyarrow.Table":
+    """Fetch a DuckDB result as an Arrow table (to_arrow_table on newer DuckDB releases)"""
+    fetch = getattr(result, 'to_arrow_table', None) or result.fetch_arrow_table
+    return fetch()
+
+def _quote_identifier(name: str) -> str:
+    """Quote a SQL identifier, escaping embedded double quotes"""
+    return '"' + name.replace('"', '""') + '"'
+
+def _quote_literal(value: str) -> str:
+    """Quote a SQL string literal, escaping embedded single quotes"""
+    return "'" + value.replace("'", "''") + "'"
+
 class DatabaseManager:
     """Database manager for SalesRAG integration"""
     
+    # Same rows as PRAGMA table_info, but the table name is a bound value rather than a
+    # parsed qualified name, so names containing double quotes still resolve
+    TABLE_INFO_SQL = '''
+        SELECT col.column_index - 1 AS cid, col.column_name AS name, col.data_type AS type,
+               NOT col.is_nullable AS notnull, col.column_default AS dflt_value,
+               EXISTS (
+                   SELECT 1 FROM duckdb_constraints() AS con
+                   WHERE con.database_name = col.database_name AND con.schema_name = col.schema_name
+                     AND con.table_name = col.table_name AND con.constraint_type = 'PRIMARY KEY'
+                     AND list_contains(con.constraint_column_names, col.column_name)
+               ) AS pk
+        FROM duckdb_columns() AS col
+        WHERE col.database_name = current_database() AND col.schema_name = current_schema()
+          AND col.table_name = ?
+    '''
+    
     def __init__(self, config: Dict[str, Any]):
         self.config = config
         self.db_path = Path(config.get("db_path", "db/sales_specs.db"))
@@ -20,20 +55,44 @@ class DatabaseManager:
         # Ensure database directories exist
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
         self.history_db_path.parent.mkdir(parents=True, exist_ok=True)
+        
+        # Long-lived read-only DuckDB connection, opened on first use
+        self._conn = None
+        self._conn_lock = threading.Lock()
+        # Table names of the read-only database, read once on first use
+        self._tables = None
+        # Column lists per table: {table_name: PRAGMA table_info rows}
+        self._schema_cache: Dict[str, list] = {}
+    
+    def _get_shared_connection(self):
+        """Return the shared DuckDB connection, opening it on first use"""
+        if self._conn is None:
+            with self._conn_lock:
+                if self._conn is None:
+                    import duckdb
+                    self._conn = duckdb.connect(str(self.db_path), read_only=True)
+        return self._conn
     
     @contextmanager
     def get_duckdb_connection(self):
-        """Get DuckDB connection context manager"""
-        conn = None
+        """Get DuckDB cursor context manager (cursors share one database connection)"""
+        cursor = None
         try:
-            conn = duckdb.connect(str(self.db_path), read_only=True)
-            yield conn
+            cursor = self._get_shared_connection().cursor()
+            yield cursor
         except Exception as e:
             logger.error(f"DuckDB connection error: {e}")
             raise
         finally:
-            if conn:
-                conn.close()
+            if cursor:
+                cursor.close()
+    
+    def close(self):
+        """Close the shared DuckDB connection"""
+        with self._conn_lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
     
     @contextmanager
     def get_history_connection(self):
@@ -50,42 +109,74 @@ class DatabaseManager:
                 conn.close()
     
     def test_connections(self) -> Dict[str, bool]:
-        """Test database connections"""
+        """Test database connections (DuckDB is probed on the shared connection)"""
         results = {}
+        probes = (
+            ("duckdb", "DuckDB", self.get_duckdb_connection),
+            ("history", "History database", self.get_history_connection),
+        )
         
-        # Test DuckDB connection
-        try:
-            with self.get_duckdb_connection() as conn:
-                conn.execute("SELECT 1").fetchone()
-                results["duckdb"] = True
-        except Exception as e:
-            logger.error(f"DuckDB test failed: {e}")
-            results["duckdb"] = False
-        
-        # Test History database connection
-        try:
-            with self.get_history_connection() as conn:
-                conn.execute("SELECT 1").fetchone()
-                results["history"] = True
-        except Exception as e:
-            logger.error(f"History database test failed: {e}")
-            results["history"] = False
+        for key, label, connect in probes:
+            try:
+                with connect() as conn:
+                    conn.execute("SELECT 1").fetchone()
+                    results[key] = True
+            except Exception as e:
+                logger.error(f"{label} test failed: {e}")
+                results[key] = False
         
         return results
     
-    def get_table_info(self, table_name: str) -> Optional[Dict[str, Any]]:
-        """Get table information"""
+    def invalidate_schema_cache(self):
+        """Forget cached table names and column lists"""
+        self._tables = None
+        self._schema_cache.clear()
+    
+    def _known_tables(self) -> set:
+        """Return the set of table names, reading SHOW TABLES once"""
+        if self._tables is None:
+            with self.get_duckdb_connection() as conn:
+                self._tables = {row[0] for row in conn.execute("SHOW TABLES").fetchall()}
+        return self._tables
+    
+    def get_table_info(self, table_name: str, exact: bool = True) -> Optional[Dict[str, Any]]:
+        """
+        Get table information
+        
+        With exact=False the row count is DuckDB's catalog estimate (duckdb_tables().estimated_size),
+        which avoids scanning the table but may include deleted rows.
+        """
         try:
+            # Only whitelisted table names ever reach the SQL text
+            if table_name not in self._known_tables():
+                logger.error(f"Unknown table: {table_name}")
+                return None
+            
             with self.get_duckdb_connection() as conn:
-                # Get column information
-                columns = conn.execute(f"PRAGMA table_info('{table_name}')").fetchall()
+                # Column information and row count in one statement
+                quoted_name = _quote_identifier(table_name)
+                if exact:
+                    row_count_sql = f"SELECT COUNT(*) FROM {quoted_name}"
+                    count_params = []
+                else:
+                    row_count_sql = "SELECT estimated_size FROM duckdb_tables() WHERE table_name = ?"
+                    count_params = [table_name]
                 
-                # Get row count
-                row_count = conn.execute(f"SELECT COUNT(*) FROM {table_name}").fetchone()[0]
+                # Column lists are cached; only the row count is re-read once they are known
+                columns = self._schema_cache.get(table_name)
+                if columns is None:
+                    rows = conn.execute(
+                        f"SELECT info.*, ({row_count_sql}) FROM ({self.TABLE_INFO_SQL}) AS info ORDER BY info.cid",
+                        count_params + [table_name]
+                    ).fetchall()
+                    columns = self._schema_cache[table_name] = [row[:-1] for row in rows]
+                    row_count = rows[0][-1] if rows else 0
+                else:
+                    row_count = conn.execute(row_count_sql, count_params).fetchone()[0]
                 
                 return {
                     "table_name": table_name,
-                    "columns": columns,
+                    "columns": list(columns),
                     "row_count": row_count
                 }
         except Exception as e:
@@ -97,12 +188,16 @@ class DatabaseManager:
         try:
             with self.get_duckdb_connection() as conn:
                 if params:
-                    results = conn.execute(query, params).fetchall()
+                    result = conn.execute(query, params)
                 else:
-                    results = conn.execute(query).fetchall()
+                    result = conn.execute(query)
+                
+                # Row-wise fetch keeps DuckDB's Python value types (int, timedelta, UUID, ...);
+                # use execute_query_arrow for columnar results
+                results = result.fetchall()
                 
                 # Get column names
-                columns = [desc[0] for desc in conn.description]
+                columns = [desc[0] for desc in result.description]
                 
                 # Convert to dict format
                 return [dict(zip(columns, row)) for row in results]
@@ -111,6 +206,15 @@ class DatabaseManager:
             logger.error(f"Query execution failed: {e}")
             raise
     
+    def execute_query_arrow(self, query: str, params: List[Any] = None) -> "pyarrow.Table":
+        """Execute a query and return results as an Arrow table (preferred for analytics)"""
+        try:
+            with self.get_duckdb_connection() as conn:
+                return _to_arrow(conn.execute(query, params or []))
+        except Exception as e:
+            logger.error(f"Query execution failed: {e}")
+            raise
+    
     def get_database_stats(self) -> Dict[str, Any]:
         """Get database statistics"""
         stats = {}
@@ -118,14 +222,31 @@ class DatabaseManager:
         try:
             with self.get_duckdb_connection() as conn:
                 # Get list of tables
-                tables = conn.execute("SHOW TABLES").fetchall()
+                tables = [row[0] for row in conn.execute("SHOW TABLES").fetchall()]
                 stats["tables"] = []
                 
-                for table in tables:
-                    table_name = table[0]
+                # Count every table in a single UNION ALL query
+                if tables:
+                    try:
+                        counts = dict(conn.execute(
+                            " UNION ALL ".join(
+                                f"SELECT ? AS name, COUNT(*) AS row_count FROM {_quote_identifier(table_name)}"
+                                for table_name in tables
+                            ),
+                            tables
+                        ).fetchall())
+                        stats["tables"] = [
+                            {"name": table_name, "row_count": counts[table_name]}
+                            for table_name in tables
+                        ]
+                        return stats
+                    except Exception as e:
+                        logger.warning(f"Batched row count failed, counting tables one by one: {e}")
+                
+                for table_name in tables:
                     try:
                         # Get row count for each table
-                        row_count = conn.execute(f"SELECT COUNT(*) FROM {table_name}").fetchone()[0]
+                        row_count = conn.execute(f"SELECT COUNT(*) FROM {_quote_identifier(table_name)}").fetchone()[0]
                         stats["tables"].append({
                             "name": table_name,
                             "row_count": row_count
@@ -146,6 +267,27 @@ class DatabaseManager:
     
     def backup_database(self, backup_path: str) -> bool:
         """Backup database"""
+        # Snapshot through DuckDB first: ATTACH a new database file and COPY FROM DATABASE
+        # gives a transactionally consistent copy even while the source is in use
+        tmp_path = Path(f"{backup_path}.tmp")
+        alias = f"backup_{threading.get_ident()}"
+        try:
+            tmp_path.unlink(missing_ok=True)
+            with self.get_duckdb_connection() as conn:
+                source = conn.execute("SELECT current_database()").fetchone()[0]
+                conn.execute(f"ATTACH {_quote_literal(str(tmp_path))} AS {alias} (READ_WRITE)")
+                try:
+                    conn.execute(f"COPY FROM DATABASE {_quote_identifier(source)} TO {alias}")
+                finally:
+                    conn.execute(f"DETACH {alias}")
+            os.replace(tmp_path, backup_path)
+            self.invalidate_schema_cache()
+            logger.info(f"Database backed up to {backup_path}")
+            return True
+        except Exception as e:
+            logger.warning(f"DuckDB snapshot backup failed, falling back to file copy: {e}")
+            tmp_path.unlink(missing_ok=True)
+        
         try:
             import shutil
             shutil.copy2(str(self.db_path), backup_path)
@@ -160,6 +302,7 @@ class DatabaseManager:
         try:
             with self.get_duckdb_connection() as conn:
                 conn.execute("VACUUM")
+                self.invalidate_schema_cache()
                 logger.info("Database vacuumed successfully")
                 return True
         except Exception as e:
@@ -169,6 +312,18 @@ class DatabaseManager:
 class HistoryDatabase:
     """Specialized database manager for history records"""
     
+    CONNECTION_PRAGMAS = '''
+        PRAGMA synchronous=NORMAL;
+        PRAGMA temp_store=MEMORY;
+        PRAGMA cache_size=-20000;
+    '''
+    
+    INSERT_RECORD_SQL = '''
+        INSERT INTO data_history 
+        (filename, data_type, record_count, error_count, status, metadata)
+        VALUES (?, ?, ?, ?, ?, ?)
+    '''
+    
     def __init__(self, db_path: str):
         self.db_path = Path(db_path)
         self.init_database()
@@ -178,7 +333,8 @@ class HistoryDatabase:
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
         
         with sqlite3.connect(str(self.db_path)) as conn:
-            conn.execute('''
+            # Table and indexes are created in one script
+            conn.executescript('''
                 CREATE TABLE IF NOT EXISTS data_history (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     filename TEXT NOT NULL,
@@ -189,24 +345,23 @@ class HistoryDatabase:
                     timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
                     metadata TEXT,
                     created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            # Create indexes for better performance
-            conn.execute('''
+                );
+                
+                -- Create indexes for better performance
                 CREATE INDEX IF NOT EXISTS idx_timestamp 
-                ON data_history(timestamp)
-            ''')
-            
-            conn.execute('''
-                CREATE INDEX IF NOT EXISTS idx_status 
-                ON data_history(status)
-            ''')
-            
-            conn.execute('''
+                ON data_history(timestamp);
+                
+                -- status has only a few values, so index just the failed rows
+                DROP INDEX IF EXISTS idx_status;
+                CREATE INDEX IF NOT EXISTS idx_status_errors 
+                ON data_history(status) WHERE status != 'success';
+                
                 CREATE INDEX IF NOT EXISTS idx_data_type 
-                ON data_history(data_type)
+                ON data_history(data_type);
             ''')
+            
+            # WAL lets readers run alongside the writer; the mode is stored in the database file
+            conn.execute("PRAGMA journal_mode=WAL")
     
     @contextmanager
     def get_connection(self):
@@ -215,6 +370,9 @@ class HistoryDatabase:
         try:
             conn = sqlite3.connect(str(self.db_path))
             conn.row_factory = sqlite3.Row  # Enable dict-like access
+            # Per-connection tuning: in WAL mode NORMAL skips the fsync on every commit
+            # while staying safe against application crashes
+            conn.executescript(self.CONNECTION_PRAGMAS)
             yield conn
         except Exception as e:
             logger.error(f"History database connection error: {e}")
@@ -229,16 +387,27 @@ class HistoryDatabase:
         """Add history record"""
         with self.get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute('''
-                INSERT INTO data_history 
-                (filename, data_type, record_count, error_count, status, metadata)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', (filename, data_type, record_count, error_count, status, metadata))
+            cursor.execute(self.INSERT_RECORD_SQL,
+                           (filename, data_type, record_count, error_count, status, metadata))
+            conn.commit()
             
             return cursor.lastrowid
     
-    def get_records(self, limit: int = 50) -> List[Dict[str, Any]]:
-        """Get history records"""
+    def add_records_bulk(self, rows: Iterable[Tuple]) -> int:
+        """
+        Add many history records in one transaction
+        
+        Each row is (filename, data_type, record_count, error_count, status, metadata).
+        Returns the number of inserted rows.
+        """
+        with self.get_connection() as conn:
+            cursor = conn.executemany(self.INSERT_RECORD_SQL, rows)
+            conn.commit()
+            
+            return cursor.rowcount
+    
+    def get_records(self, limit: int = 50) -> List[sqlite3.Row]:
+        """Get history records as sqlite3.Row objects (access fields by name; dict(row) for a real dict)"""
         with self.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute('''
@@ -247,31 +416,26 @@ class HistoryDatabase:
                 LIMIT ?
             ''', (limit,))
             
-            return [dict(row) for row in cursor.fetchall()]
+            return cursor.fetchall()
     
     def get_stats(self) -> Dict[str, Any]:
         """Get history statistics"""
         with self.get_connection() as conn:
             cursor = conn.cursor()
             
-            # Basic stats
-            cursor.execute('SELECT COUNT(*) FROM data_history')
-            total_records = cursor.fetchone()[0]
-            
-            cursor.execute('SELECT COUNT(*) FROM data_history WHERE status = "success"')
-            success_records = cursor.fetchone()[0]
-            
-            cursor.execute('SELECT SUM(record_count) FROM data_history')
-            total_processed = cursor.fetchone()[0] or 0
-            
-            # By data type
+            # Per-type stats in a single scan; overall totals are summed from them
             cursor.execute('''
-                SELECT data_type, COUNT(*), SUM(record_count)
+                SELECT data_type, COUNT(*), SUM(record_count),
+                       SUM(CASE WHEN status = 'success' THEN 1 ELSE 0 END)
                 FROM data_history
                 GROUP BY data_type
             ''')
             type_stats = cursor.fetchall()
             
+            total_records = sum(row[1] for row in type_stats)
+            success_records = sum(row[3] for row in type_stats)
+            total_processed = sum(row[2] or 0 for row in type_stats)
+            
             return {
                 "total_records": total_records,
                 "success_records": success_records,